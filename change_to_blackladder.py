@@ -1,23 +1,32 @@
 #!/usr/bin/env python3
 """Script to change all fonts to Blackladder ITC"""
 
+import re
+import sys
+from pathlib import Path
+
 # Read the file
-with open('promptcraft_studio.py', 'r') as f:
-    content = f.read()
+source = Path('promptcraft_studio.py')
+content = source.read_text(encoding='utf-8')
+
+# Nothing to replace; leave the file (and its mtime) untouched
+if 'Franklin Gothic Medium' not in content:
+    print('No Franklin Gothic Medium fonts found, nothing to do.')
+    sys.exit(0)
 
 # Replace Franklin Gothic Medium with Blackladder ITC
 content = content.replace('Franklin Gothic Medium', 'Blackladder ITC')
 
 # Write back
-with open('promptcraft_studio.py', 'w') as f:
-    f.write(content)
+source.write_text(content, encoding='utf-8')
 
 print('Successfully replaced all fonts with Blackladder ITC!')
 print('Searching for instances...')
 
 # Show where changes were made
-import re
-lines = content.split('\n')
-for i, line in enumerate(lines, 1):
-    if 'Blackladder ITC' in line:
-        print(f'{i}: {line.strip()}')
+line_pattern = re.compile(r'^.*Blackladder ITC.*$', re.M)
+line_number, last_pos = 1, 0
+for match in line_pattern.finditer(content):
+    line_number += content.count('\n', last_pos, match.start())
+    last_pos = match.start()
+    print(f'{line_number}: {match.group().strip()}')
@@ -4,30 +4,122 @@ History Manager Module
 Handles saving and loading prompt history
 """
 
+import atexit
+import functools
+import hashlib
+import heapq
 import json
 import os
+import queue
+import re
+import threading
+from collections import deque
 from datetime import datetime
-from typing import List, Dict, Optional
+from itertools import islice
+from typing import Deque, Iterable, List, Dict, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_SHARD_NAME_RE = re.compile(r'\d{4}-\d{2}')
+
+
+def dumps_json(data, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 encoded JSON, using orjson when available
+    
+    Output is compact unless indent is set; only exports are meant to be
+    read by people.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def loads_json(raw):
+    """Parse JSON from str or bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+@functools.lru_cache(maxsize=None)
+def _default_history_dir() -> str:
+    """Get the default history directory, creating it on first call"""
+    history_dir = os.path.join(os.path.expanduser('~'), '.promptcraft_studio')
+    os.makedirs(history_dir, exist_ok=True)
+    return history_dir
+
+
+def _shard_name(timestamp: str) -> str:
+    """Get the year-month shard an ISO timestamp belongs to
+    
+    Anything else, including non-string timestamps from imported files,
+    goes to the '0000-00' shard.
+    """
+    if isinstance(timestamp, str) and _SHARD_NAME_RE.match(timestamp):
+        return timestamp[:7]
+    return '0000-00'
+
+
+def _trigrams(text: str) -> frozenset:
+    """Get the set of 3-character substrings of text"""
+    return frozenset(text[i:i + 3] for i in range(len(text) - 2))
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_terms(terms: tuple, mode: str):
+    """Compile lowercased search terms into a single pattern
+    
+    'any' matches if one of the terms occurs; 'all' requires every term.
+    """
+    escaped = [re.escape(term) for term in terms]
+    if mode == 'all':
+        return re.compile(r'\A' + ''.join(f'(?=.*?{term})' for term in escaped),
+                          re.DOTALL)
+    return re.compile('|'.join(escaped))
 
 
 class PromptHistoryEntry:
     """Represents a single prompt history entry"""
     
+    __slots__ = ('user_input', 'generated_prompt', 'template_id', 'timestamp',
+                 '_dt', '_cached_dict', '_display_cache', '_search_blob', '_trigrams')
+    
     def __init__(self, user_input: str, generated_prompt: str, 
                  template_id: str = 'context_aware', timestamp: str = None):
         self.user_input = user_input
         self.generated_prompt = generated_prompt
         self.template_id = template_id
-        self.timestamp = timestamp or datetime.now().isoformat()
+        if timestamp:
+            self.timestamp = timestamp
+            self._dt = None  # Parsed on first display
+        else:
+            self._dt = datetime.now()
+            self.timestamp = self._dt.isoformat()
+        self._cached_dict = None
+        self._display_cache: Dict[int, str] = {}
+        # Lowercased text searched by search_history; the NUL keeps matches
+        # from spanning both fields
+        self._search_blob = (user_input + '\x00' + generated_prompt).lower()
+        self._trigrams = None  # Built on first prefiltered search
     
     def to_dict(self) -> Dict:
-        """Convert to dictionary for JSON serialization"""
-        return {
-            'user_input': self.user_input,
-            'generated_prompt': self.generated_prompt,
-            'template_id': self.template_id,
-            'timestamp': self.timestamp
-        }
+        """Convert to dictionary for JSON serialization
+        
+        Entries are never mutated after creation, so the dict is built once.
+        """
+        if self._cached_dict is None:
+            self._cached_dict = {
+                'user_input': self.user_input,
+                'generated_prompt': self.generated_prompt,
+                'template_id': self.template_id,
+                'timestamp': self.timestamp
+            }
+        return self._cached_dict
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'PromptHistoryEntry':
@@ -39,112 +131,395 @@ class PromptHistoryEntry:
             timestamp=data.get('timestamp')
         )
     
+    @classmethod
+    def _fast_from_dict(cls, data: Dict) -> 'PromptHistoryEntry':
+        """Create from a dictionary written by to_dict
+        
+        Skips the per-field defaults of from_dict and reuses data as the
+        cached dict. Falls back to from_dict for malformed entries.
+        """
+        try:
+            entry = cls(data['user_input'], data['generated_prompt'],
+                        data['template_id'], data['timestamp'])
+        except KeyError:
+            return cls.from_dict(data)
+        if len(data) == 4:
+            entry._cached_dict = data
+        return entry
+    
+    @property
+    def key(self) -> tuple:
+        """Identity used to detect duplicate entries"""
+        return (self.timestamp, self.user_input)
+    
+    def matches(self, query_lower: str, query_trigrams: frozenset = None) -> bool:
+        """Check whether a lowercased query occurs in this entry
+        
+        If query_trigrams is given, entries missing any of them are rejected
+        before the substring scan.
+        """
+        if query_trigrams:
+            if self._trigrams is None:
+                self._trigrams = _trigrams(self._search_blob)
+            if not query_trigrams <= self._trigrams:
+                return False
+        return query_lower in self._search_blob
+    
     def get_display_text(self, max_length: int = 60) -> str:
         """Get shortened text for display in list"""
+        cached = self._display_cache.get(max_length)
+        if cached is not None:
+            return cached
+        
         text = self.user_input.replace('\n', ' ').strip()
         if len(text) > max_length:
             text = text[:max_length] + '...'
         
-        # Add timestamp
-        try:
-            dt = datetime.fromisoformat(self.timestamp)
-            time_str = dt.strftime('%m/%d %H:%M')
-        except:
-            time_str = 'Unknown'
+        # Add timestamp; anything shorter than a date can't be ISO format
+        time_str = 'Unknown'
+        if (self._dt is None and isinstance(self.timestamp, str)
+                and len(self.timestamp) >= 10):
+            try:
+                self._dt = datetime.fromisoformat(self.timestamp)
+            except (ValueError, TypeError):
+                pass
+        if self._dt is not None:
+            time_str = self._dt.strftime('%m/%d %H:%M')
         
-        return f"[{time_str}] {text}"
+        display_text = f"[{time_str}] {text}"
+        self._display_cache[max_length] = display_text
+        return display_text
 
 
 class HistoryManager:
-    """Manages prompt history persistence"""
+    """Manages prompt history persistence
+    
+    History is stored as JSON Lines logs sharded by month
+    (``<prefix>-YYYY-MM.jsonl``, oldest first, one entry per line). New
+    entries are appended to their month's shard; the logs are compacted back
+    down to ``max_history`` entries every ``compact_every`` appends and at
+    exit. Logs are only read on first access, so adding entries never needs
+    them, and loading stops at the newest shards holding ``max_history``.
+    
+    Appends are written behind by a background thread, batched once no new
+    entry has arrived for ``write_delay`` seconds; ``flush`` waits for them.
+    """
     
     def __init__(self, history_file: str = None):
+        self._legacy_file = None
         if history_file is None:
             # Default to user's home directory
-            home = os.path.expanduser('~')
-            history_dir = os.path.join(home, '.promptcraft_studio')
-            os.makedirs(history_dir, exist_ok=True)
-            self.history_file = os.path.join(history_dir, 'history.json')
+            history_dir = _default_history_dir()
+            self.history_dir = history_dir
+            self.history_prefix = 'history'
+            self._legacy_file = os.path.join(history_dir, 'history.json')
         else:
-            self.history_file = history_file
+            # Shards live next to the given file, named after its stem
+            self.history_dir = os.path.dirname(os.path.abspath(history_file))
+            self.history_prefix = os.path.splitext(os.path.basename(history_file))[0]
+            self._legacy_file = history_file
+        self._shard_re = re.compile(re.escape(self.history_prefix) + r'-(\d{4}-\d{2})\.jsonl')
+        
+        # Most recent first; appendleft evicts the oldest entry once full
+        self._max_history = 100  # Keep last 100 entries
+        self.history: Deque[PromptHistoryEntry] = deque(maxlen=self._max_history)
+        self._keys = set()  # PromptHistoryEntry.key of every entry in history
+        self.trigram_min_entries = 500  # Prefilter searches above this size
+        self.compact_every = 50  # Rewrite the logs after this many appends
+        self._dirty = 0  # Appends since the logs were last rewritten
+        self._shard_hashes: Dict[str, bytes] = {}  # Digest of each rewritten shard
+        self._loaded = False
+        # Set when the logs could not be read; memory is then incomplete, so
+        # the logs are never rewritten from it
+        self._load_failed = False
+        
+        # Write-behind queue of (generation, entry). A rewrite bumps the
+        # generation, and queued entries from before it are skipped since
+        # the rewrite already saved them from memory
+        self.write_delay = 0.5
+        self._write_queue = queue.Queue()
+        self._writer = None
+        self._generation = 0
+        self._io_lock = threading.RLock()
+        atexit.register(self.compact)
+    
+    @property
+    def max_history(self) -> int:
+        """Maximum number of entries kept"""
+        return self._max_history
+    
+    @max_history.setter
+    def max_history(self, value: int):
+        with self._io_lock:
+            self._max_history = value
+            self._set_history(list(self.history))
+    
+    def _set_history(self, entries: Iterable[PromptHistoryEntry]):
+        """Replace history with entries (most recent first), keeping the newest
         
-        self.history: List[PromptHistoryEntry] = []
-        self.max_history = 100  # Keep last 100 entries
-        self.load_history()
+        Duplicate entries are dropped.
+        """
+        history = deque(maxlen=self._max_history)
+        keys = set()
+        # Held while entries is read too, since it may iterate self.history
+        with self._io_lock:
+            for entry in entries:
+                if len(history) >= self._max_history:
+                    break
+                key = entry.key
+                if key not in keys:
+                    keys.add(key)
+                    history.append(entry)
+            self.history = history
+            self._keys = keys
     
     def add_entry(self, user_input: str, generated_prompt: str, 
-                  template_id: str = 'context_aware'):
-        """Add a new history entry"""
+                  template_id: str = 'context_aware') -> Optional[PromptHistoryEntry]:
+        """Add a new history entry, returning it or None if a duplicate"""
         entry = PromptHistoryEntry(user_input, generated_prompt, template_id)
-        self.history.insert(0, entry)  # Add to beginning (most recent first)
+        if entry.key in self._keys:
+            return None
+        
+        with self._io_lock:
+            if len(self.history) == self._max_history:
+                self._keys.discard(self.history.pop().key)
+            self.history.appendleft(entry)  # Add to beginning (most recent first)
+            self._keys.add(entry.key)
+            self._write_queue.put((self._generation, entry))
+        
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, daemon=True,
+                                            name='history-writer')
+            self._writer.start()
+        return entry
+    
+    def _write_loop(self):
+        """Append queued entries in batches (runs on the writer thread)"""
+        while True:
+            batch = [self._write_queue.get()]
+            # Keep collecting until the queue has been quiet for write_delay
+            while True:
+                try:
+                    batch.append(self._write_queue.get(timeout=self.write_delay))
+                except queue.Empty:
+                    break
+            
+            try:
+                with self._io_lock:
+                    self._append([entry for generation, entry in batch
+                                  if generation == self._generation])
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+    
+    def _append(self, entries: List[PromptHistoryEntry]):
+        """Append entries to their shards, compacting periodically"""
+        if not entries:
+            return
+        shard_lines: Dict[str, List[bytes]] = {}
+        for entry in entries:  # Queued oldest first, as in the logs
+            shard_lines.setdefault(_shard_name(entry.timestamp), []).append(
+                dumps_json(entry.to_dict()) + b'\n')
         
-        # Trim history if too long
-        if len(self.history) > self.max_history:
-            self.history = self.history[:self.max_history]
+        for shard, lines in shard_lines.items():
+            try:
+                with open(self._shard_file(shard), 'a+b') as f:
+                    # Start on a fresh line if a crash left a partial one
+                    size = f.seek(0, os.SEEK_END)
+                    if size:
+                        f.seek(size - 1)
+                        if f.read(1) != b'\n':
+                            lines.insert(0, b'\n')
+                    f.write(b''.join(lines))
+            except Exception as e:
+                print(f"Error saving history: {e}")
+                continue
+            self._shard_hashes.pop(shard, None)
+            self._dirty += len(lines)
         
-        self.save_history()
+        # Compaction rewrites from memory, which is only complete once loaded
+        # and when no appends are still waiting
+        if (self._dirty >= self.compact_every and self._loaded
+                and self._write_queue.empty()):
+            self._rewrite_all()
+    
+    def flush(self):
+        """Wait until every added entry has been written"""
+        if self._writer is not None and threading.current_thread() is not self._writer:
+            self._write_queue.join()
+    
+    def _shard_file(self, shard: str) -> str:
+        """Get the path of a shard's log"""
+        return os.path.join(self.history_dir, f'{self.history_prefix}-{shard}.jsonl')
+    
+    def _list_shards(self) -> List[str]:
+        """Get the names of existing shards, newest first"""
+        try:
+            names = os.listdir(self.history_dir)
+        except FileNotFoundError:
+            return []
+        matches = (self._shard_re.fullmatch(name) for name in names)
+        return sorted((m.group(1) for m in matches if m), reverse=True)
+    
+    def compact(self):
+        """Rewrite the logs if entries were appended since the last rewrite"""
+        self.flush()
+        if self._dirty:
+            self._ensure_loaded()
+            self._rewrite_all()
+    
+    def _ensure_loaded(self):
+        """Load history from file on first access"""
+        if not self._loaded:
+            # Entries added before loading only reach memory via the logs
+            self.flush()
+            self.load_history()
     
     def get_history(self, limit: int = None) -> List[PromptHistoryEntry]:
         """Get history entries (most recent first)"""
+        self._ensure_loaded()
         if limit:
-            return self.history[:limit]
-        return self.history
+            return list(islice(self.history, limit))
+        return list(self.history)
     
     def get_entry(self, index: int) -> Optional[PromptHistoryEntry]:
         """Get a specific history entry by index"""
+        self._ensure_loaded()
         if 0 <= index < len(self.history):
             return self.history[index]
         return None
     
     def clear_history(self):
         """Clear all history"""
-        self.history = []
-        self.save_history()
+        # Under the lock so a compaction on the writer thread never sees
+        # history change mid-write
+        with self._io_lock:
+            self._loaded = True
+            self._load_failed = False  # Clearing discards the unreadable logs too
+            self.history.clear()
+            self._keys.clear()
+            self._rewrite_all()
     
     def delete_entry(self, index: int):
         """Delete a specific entry"""
-        if 0 <= index < len(self.history):
-            del self.history[index]
-            self.save_history()
+        self._ensure_loaded()
+        with self._io_lock:
+            if 0 <= index < len(self.history):
+                self._keys.discard(self.history[index].key)
+                del self.history[index]
+                self._rewrite_all()
+    
+    def _rewrite_all(self) -> bool:
+        """Rewrite the shard logs from the in-memory history, returning success
+        
+        Each shard is replaced atomically, and left alone if its contents
+        would not change. Shards with no remaining entries are removed.
+        """
+        with self._io_lock:
+            if self._load_failed:
+                print("History was not fully loaded; leaving the logs unchanged")
+                return False
+            # Entries still queued are in memory and saved here
+            self._generation += 1
+            return self._write_shards()
     
-    def save_history(self):
-        """Save history to file"""
+    def _write_shards(self) -> bool:
+        """Write every shard from the in-memory history, returning success"""
         try:
-            data = {
-                'version': '1.0',
-                'history': [entry.to_dict() for entry in self.history]
-            }
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            shard_lines: Dict[str, List[bytes]] = {}
+            for entry in reversed(self.history):
+                shard_lines.setdefault(_shard_name(entry.timestamp), []).append(
+                    dumps_json(entry.to_dict()) + b'\n')
+            
+            for shard, lines in shard_lines.items():
+                payload = b''.join(lines)
+                digest = hashlib.blake2b(payload, digest_size=16).digest()
+                if digest != self._shard_hashes.get(shard):
+                    shard_file = self._shard_file(shard)
+                    tmp_file = shard_file + '.tmp'
+                    with open(tmp_file, 'wb') as f:
+                        f.write(payload)
+                    os.replace(tmp_file, shard_file)
+                    self._shard_hashes[shard] = digest
+            
+            for shard in self._list_shards():
+                if shard not in shard_lines:
+                    os.remove(self._shard_file(shard))
+                    self._shard_hashes.pop(shard, None)
+            self._dirty = 0
+            return True
         except Exception as e:
             print(f"Error saving history: {e}")
+            return False
     
     def load_history(self):
         """Load history from file"""
-        if not os.path.exists(self.history_file):
+        self._loaded = True
+        shards = self._list_shards()
+        if not shards:
+            if self._legacy_file and os.path.exists(self._legacy_file):
+                self._load_legacy()
             return
         
+        # Shards are oldest first; read from the newest shard back until
+        # there are enough entries to fill max_history
+        entries = []
+        for shard in shards:
+            try:
+                with open(self._shard_file(shard), 'rb') as f:
+                    lines = [line for line in f if line.strip()]
+            except Exception as e:
+                print(f"Error loading history: {e}")
+                self._load_failed = True
+                continue
+            
+            # Parse line by line so a partial line left by a crash only
+            # costs that entry
+            for line in reversed(lines):
+                try:
+                    entries.append(PromptHistoryEntry._fast_from_dict(loads_json(line)))
+                except Exception as e:
+                    print(f"Skipping unreadable history line: {e}")
+            if len(entries) >= self.max_history:
+                break
+        
+        self._set_history(entries)
+    
+    def _load_legacy(self):
+        """Migrate history saved by older versions as a single JSON document"""
         try:
-            with open(self.history_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(self._legacy_file, 'rb') as f:
+                data = loads_json(f.read())
             
             history_data = data.get('history', [])
-            self.history = [PromptHistoryEntry.from_dict(entry) 
-                          for entry in history_data]
+            self._set_history(PromptHistoryEntry.from_dict(entry) 
+                              for entry in history_data)
         except Exception as e:
             print(f"Error loading history: {e}")
-            self.history = []
+            self._set_history(())
+            self._load_failed = True
+            return
+        
+        # Once the shards hold it, set the old file aside; left in place it
+        # would be migrated again whenever no shards remain
+        if self._rewrite_all():
+            try:
+                os.replace(self._legacy_file, self._legacy_file + '.migrated')
+            except Exception as e:
+                print(f"Error renaming migrated history: {e}")
     
     def export_history(self, export_file: str):
         """Export history to a file"""
+        self._ensure_loaded()
         try:
             data = {
                 'version': '1.0',
                 'exported_at': datetime.now().isoformat(),
                 'history': [entry.to_dict() for entry in self.history]
             }
-            with open(export_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            payload = dumps_json(data, indent=True)
+            with open(export_file, 'wb') as f:
+                f.write(payload)
             return True
         except Exception as e:
             print(f"Error exporting history: {e}")
@@ -152,36 +527,55 @@ class HistoryManager:
     
     def import_history(self, import_file: str, merge: bool = True):
         """Import history from a file"""
+        self._ensure_loaded()
         try:
-            with open(import_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(import_file, 'rb') as f:
+                data = loads_json(f.read())
             
-            imported_entries = [PromptHistoryEntry.from_dict(entry) 
+            imported_entries = [PromptHistoryEntry._fast_from_dict(entry) 
                               for entry in data.get('history', [])]
             
             if merge:
-                # Merge with existing history
-                self.history.extend(imported_entries)
-                # Sort by timestamp (most recent first)
-                self.history.sort(key=lambda x: x.timestamp, reverse=True)
-                # Trim if needed
-                if len(self.history) > self.max_history:
-                    self.history = self.history[:self.max_history]
+                # Merge with existing history, sorted by timestamp (most recent
+                # first). History is already in that order, so only the imported
+                # entries need sorting and _set_history stops after max_history
+                imported_entries.sort(key=lambda x: x.timestamp, reverse=True)
+                self._set_history(heapq.merge(self.history, imported_entries,
+                                              key=lambda x: x.timestamp, reverse=True))
             else:
                 # Replace existing history
-                self.history = imported_entries
+                self._set_history(imported_entries)
             
-            self.save_history()
+            self._rewrite_all()
             return True
         except Exception as e:
             print(f"Error importing history: {e}")
             return False
     
-    def search_history(self, query: str) -> List[PromptHistoryEntry]:
-        """Search history by query string"""
+    def search_history(self, query: str, 
+                       mode: str = 'substring') -> List[PromptHistoryEntry]:
+        """Search history by query string
+        
+        mode is 'substring' to match the whole query, or 'any'/'all' to match
+        any/all of its whitespace-separated terms.
+        """
+        self._ensure_loaded()
         query_lower = query.lower()
+        
+        if mode in ('any', 'all'):
+            terms = tuple(query_lower.split())
+            if not terms:
+                return list(self.history)
+            pattern = _compile_terms(terms, mode)
+            return [
+                entry for entry in self.history
+                if pattern.search(entry._search_blob)
+            ]
+        
+        query_trigrams = None
+        if len(self.history) >= self.trigram_min_entries:
+            query_trigrams = _trigrams(query_lower)
         return [
             entry for entry in self.history
-            if query_lower in entry.user_input.lower() or 
-               query_lower in entry.generated_prompt.lower()
+            if entry.matches(query_lower, query_trigrams)
         ]
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Prompt Cache Module
+Caches generated prompts by exact and semantically similar input, and API
+responses by the exact request on disk
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class PromptCache:
+    """LRU cache of generated prompts with embedding-similarity fallback
+    
+    Keys are normalized user inputs, so callers should only use it for
+    requests with no conversation context. A lookup that misses exactly falls
+    back to the most similar cached input by cosine similarity, when
+    sentence-transformers is installed; the threshold is kept high because
+    near-paraphrases like "sort ascending"/"sort descending" embed closely.
+    
+    Embedding loads and runs the model, so it is only done by lookup, which
+    belongs on a worker thread; put reuses the embedding lookup returned.
+    """
+    
+    def __init__(self, max_entries: int = 256, similarity_threshold: float = 0.97,
+                 embedding_model: str = 'all-MiniLM-L6-v2'):
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.embedding_model = embedding_model
+        self.entries: OrderedDict = OrderedDict()  # Key -> response, oldest first
+        
+        self._embedder = None  # Loaded on first use; False if unavailable
+        self._embeddings = None  # float32 matrix, one row per embedding key
+        self._embedding_keys = []
+        self._lock = threading.Lock()  # Lookups happen on worker threads
+        self._embedder_lock = threading.Lock()  # Held while loading the model
+    
+    def get(self, key: str) -> Optional[str]:
+        """Get the response cached for key or a near-duplicate of it"""
+        return self.lookup(key)[0]
+    
+    def lookup(self, key: str) -> tuple:
+        """Get (response, embedding) for key, either of which may be None
+        
+        On a miss the embedding of key is still returned, to be passed to
+        put so it never has to run the model itself.
+        """
+        with self._lock:
+            response = self.entries.get(key)
+            if response is not None:
+                self.entries.move_to_end(key)
+                return response, None
+        
+        query = self._embed(key)
+        if query is None:
+            return None, None
+        
+        with self._lock:
+            if self._embeddings is None:
+                return None, query
+            # Embeddings are normalized, so one matrix product gives every cosine
+            scores = self._embeddings @ query
+            best = int(scores.argmax())
+            if scores[best] <= self.similarity_threshold:
+                return None, query
+            
+            match = self._embedding_keys[best]
+            self.entries.move_to_end(match)
+            return self.entries[match], query
+    
+    def put(self, key: str, response: str, embedding=None):
+        """Cache a response, evicting the least recently used entry if full
+        
+        The entry only takes part in similarity matching if its embedding
+        (from lookup) is given.
+        """
+        with self._lock:
+            if key in self.entries:
+                self.entries[key] = response
+                self.entries.move_to_end(key)
+                return
+            
+            self.entries[key] = response
+            if embedding is not None:
+                import numpy as np
+                row = embedding.reshape(1, -1)
+                if self._embeddings is None:
+                    self._embeddings = row
+                else:
+                    self._embeddings = np.vstack([self._embeddings, row])
+                self._embedding_keys.append(key)
+            
+            if len(self.entries) > self.max_entries:
+                evicted, _ = self.entries.popitem(last=False)
+                self._drop_embedding(evicted)
+    
+    def clear(self):
+        """Remove all cached responses"""
+        with self._lock:
+            self.entries.clear()
+            self._embeddings = None
+            self._embedding_keys = []
+    
+    def _drop_embedding(self, key: str):
+        """Remove the embedding row of an evicted key"""
+        if key not in self._embedding_keys:
+            return
+        import numpy as np
+        index = self._embedding_keys.index(key)
+        del self._embedding_keys[index]
+        self._embeddings = np.delete(self._embeddings, index, axis=0)
+        if not self._embedding_keys:
+            self._embeddings = None
+    
+    def _embed(self, text: str):
+        """Get the normalized float32 embedding of text, or None if unavailable"""
+        with self._embedder_lock:
+            if self._embedder is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    self._embedder = SentenceTransformer(self.embedding_model)
+                except Exception as e:
+                    print(f"Semantic prompt cache unavailable: {e}")
+                    self._embedder = False
+        if not self._embedder:
+            return None
+        
+        return self._embedder.encode(
+            text, normalize_embeddings=True
+        ).astype('float32')
+
+
+class ResponseCache:
+    """Persistent cache of API responses keyed by the exact request
+    
+    Responses are stored in SQLite so they survive restarts, with the most
+    recently used ones also kept in memory. The database keeps at most
+    ``max_disk_entries`` responses, dropping the least recently used.
+    """
+    
+    def __init__(self, cache_file: str = None, max_memory_entries: int = 128,
+                 max_disk_entries: int = 5000):
+        if cache_file is None:
+            cache_dir = os.path.join(os.path.expanduser('~'), '.veloxmind_studio')
+            cache_file = os.path.join(cache_dir, 'response_cache.db')
+        self.cache_file = cache_file
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.memory: OrderedDict = OrderedDict()  # Key -> response, oldest first
+        
+        self._conn = None  # Opened on first use
+        self._lock = threading.Lock()  # Lookups happen on worker threads
+    
+    @staticmethod
+    def make_key(model: str, system_prompt: str, messages: list) -> str:
+        """Hash a request into a cache key"""
+        payload = json.dumps([model, system_prompt, messages],
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Get the cached response for a request key"""
+        with self._lock:
+            response = self.memory.get(key)
+            if response is not None:
+                self.memory.move_to_end(key)
+            else:
+                try:
+                    row = self._connect().execute(
+                        'SELECT response FROM responses WHERE key = ?', (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    print(f"Error reading response cache: {e}")
+                    return None
+                if row is None:
+                    return None
+                response = row[0]
+                self._remember(key, response)
+            
+            # Hits keep the response from being pruned
+            try:
+                conn = self._connect()
+                with conn:
+                    conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?',
+                                 (time.time(), key))
+            except sqlite3.Error as e:
+                print(f"Error updating response cache: {e}")
+            return response
+    
+    def put(self, key: str, response: str):
+        """Cache a response on disk and in memory"""
+        with self._lock:
+            self._remember(key, response)
+            try:
+                conn = self._connect()
+                with conn:
+                    conn.execute(
+                        'INSERT OR REPLACE INTO responses (key, response, accessed_at) '
+                        'VALUES (?, ?, ?)',
+                        (key, response, time.time())
+                    )
+                    # Drop the least recently used responses beyond the cap
+                    conn.execute(
+                        'DELETE FROM responses WHERE key IN (SELECT key FROM responses '
+                        'ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                        (self.max_disk_entries,)
+                    )
+            except sqlite3.Error as e:
+                print(f"Error saving response cache: {e}")
+    
+    def clear(self):
+        """Remove all cached responses"""
+        with self._lock:
+            self.memory.clear()
+            try:
+                conn = self._connect()
+                with conn:
+                    conn.execute('DELETE FROM responses')
+            except sqlite3.Error as e:
+                print(f"Error clearing response cache: {e}")
+    
+    def _remember(self, key: str, response: str):
+        """Keep a response in the in-memory LRU"""
+        self.memory[key] = response
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the cache database, creating it if needed"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            conn = sqlite3.connect(self.cache_file, check_same_thread=False)
+            with conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS responses '
+                    '(key TEXT PRIMARY KEY, response TEXT, accessed_at REAL NOT NULL DEFAULT 0)'
+                )
+                # Databases from before pruning have no access times
+                columns = [row[1] for row in conn.execute('PRAGMA table_info(responses)')]
+                if 'accessed_at' not in columns:
+                    conn.execute('ALTER TABLE responses '
+                                 'ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0')
+                conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed_at '
+                             'ON responses (accessed_at)')
+            self._conn = conn
+        return self._conn
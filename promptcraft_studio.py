@@ -6,11 +6,19 @@ using Perplexity AI to intelligently craft task-specific prompts with history an
 """
 
 import tkinter as tk
-from tkinter import scrolledtext, messagebox, filedialog
+from tkinter import scrolledtext, messagebox, filedialog, ttk
+import tkinter.font as tkfont
+import functools
 import os
-import json
 from datetime import datetime
 import re
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
 
 try:
     from dotenv import load_dotenv
@@ -18,22 +26,8 @@ try:
 except ImportError:
     pass
 
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
-
-try:
-    from anthropic import Anthropic
-except ImportError:
-    Anthropic = None
-
-try:
-    from spellchecker import SpellChecker
-except ImportError:
-    SpellChecker = None
-
-from history_manager import HistoryManager
+from history_manager import HistoryManager, dumps_json, loads_json
+from prompt_cache import PromptCache, ResponseCache
 
 
 # ===== BLACK & GOLD COLOR PALETTE =====
@@ -58,14 +52,127 @@ COLOR_INPUT_BG = '#2a2a2a'
 COLOR_BORDER = '#333333'
 COLOR_SELECTION = '#FFD700'
 
+# ===== AI CONFIGURATION =====
+# System prompt for AI assistant behavior. Kept constant so every request
+# starts with the same prefix and provider-side prompt caching can hit.
+SYSTEM_PROMPT = """Transform the user's input into a clear, AI-ready prompt. Follow their input as closely as possible - preserve their exact intent, wording, and all specific details. Make it detailed enough to be actionable but concise. Use context from previous messages. Don't add extra information not requested by the user."""
+
+# Output token budget for a generation: twice the input, within these bounds
+MIN_OUTPUT_TOKENS = 1024
+MAX_OUTPUT_TOKENS = 2000
+
+# Used to fold turns trimmed from the conversation into a rolling summary
+SUMMARY_PROMPT = """Summarize the following conversation in at most 300 tokens, preserving facts and user preferences. If an earlier summary is included, merge it into the new one."""
+
+# ===== TEXT PATTERNS =====
+WORD_PATTERN = re.compile(r'\b[a-zA-Z]{3,}\b')  # Words checked for spelling (3+ letters)
+MULTI_SPACE_PATTERN = re.compile(r'[ \t]{2,}')  # Runs of spaces/tabs
+LINE_EDGE_SPACE_PATTERN = re.compile(r'[^\S\n]*\n[^\S\n]*')  # Whitespace around line breaks
+BLANK_LINES_PATTERN = re.compile(r'\n{3,}')  # More than one blank line in a row
+
+# Turns lone carriage returns into newlines and drops the other control
+# characters (all but tab and newline) in a single str.translate pass
+SANITIZE_TABLE = dict.fromkeys([*range(0x00, 0x09), *range(0x0B, 0x20), 0x7F])
+SANITIZE_TABLE[ord('\r')] = '\n'
+
 # ===== GOTHIC FONT CONFIGURATION =====
 GOTHIC_FONT = 'Futura'  # Primary font for most text
 GOTHIC_FONT_FALLBACK = 'Century Gothic'  # Fallback if primary not available
 TITLE_FONT = 'Monster of South St'  # Special font for title only
 
+# Shared Font objects, keyed by (family, size, weight)
+FONTS = {}
+
+
+@functools.lru_cache(maxsize=None)
+def get_token_encoder(model: str):
+    """Get the tiktoken encoding for a model, or None if tiktoken is missing"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        # Unknown to tiktoken (e.g. Claude models, or no model at all);
+        # close enough for a budget
+        pass
+    try:
+        return tiktoken.get_encoding('o200k_base')
+    except Exception as e:
+        # The encoding files are downloaded on first use
+        print(f"Error loading token encoder: {e}")
+        return None
+
+
+def get_font(size, weight='normal', family=GOTHIC_FONT):
+    """Get a shared Font so Tk resolves each family/size/weight only once"""
+    key = (family, size, weight)
+    font = FONTS.get(key)
+    if font is None:
+        font = tkfont.Font(family=family, size=size, weight=weight)
+        FONTS[key] = font
+    return font
+
+
+def apply_text_corrections(text, corrections):
+    """Build the corrected text from {start, end, replacement} corrections"""
+    # One forward pass over unchanged spans and replacements, joined once
+    parts = []
+    position = 0
+    for correction in sorted(corrections, key=lambda x: x['start']):
+        parts.append(text[position:correction['start']])
+        parts.append(correction['replacement'])
+        position = correction['end']
+    parts.append(text[position:])
+    return ''.join(parts)
+
+
+def configure_styles(root):
+    """Configure the ttk styles used for frames, labels and dropdowns"""
+    style = ttk.Style(root)
+    # Native themes such as aqua ignore most colour options; clam honours them
+    style.theme_use('clam')
+    
+    # Frames
+    style.configure('Dark.TFrame', background=COLOR_DARK_BG)
+    style.configure('Input.TFrame', background=COLOR_INPUT_BG)
+    style.configure('Border.TFrame', background=COLOR_BORDER)
+    style.configure('Row.TFrame', background=COLOR_INPUT_BG, relief=tk.RAISED, borderwidth=1)
+    style.configure('HandledRow.TFrame', background=COLOR_DARKER_BG, relief=tk.RAISED, borderwidth=1)
+    
+    # Labels on the dark background and on input panels
+    for prefix, background in (('', COLOR_DARK_BG), ('Input', COLOR_INPUT_BG)):
+        style.configure(f'{prefix}Light.TLabel', background=background, foreground=COLOR_TEXT_LIGHT)
+        style.configure(f'{prefix}Gold.TLabel', background=background, foreground=COLOR_TEXT_GOLD)
+        style.configure(f'{prefix}Dim.TLabel', background=background, foreground=COLOR_TEXT_DIM)
+    
+    # Generation progress bar
+    style.configure(
+        'Gold.Horizontal.TProgressbar',
+        background=COLOR_GOLD,
+        troughcolor=COLOR_DARKER_BG,
+        borderwidth=0
+    )
+    
+    # Spell check suggestion dropdowns
+    style.configure(
+        'Gold.TCombobox',
+        fieldbackground=COLOR_DARKER_BG,
+        foreground=COLOR_TEXT_LIGHT
+    )
+    # The dropdowns are read-only, which clam colours through the state map
+    style.map(
+        'Gold.TCombobox',
+        fieldbackground=[('readonly', COLOR_DARKER_BG)],
+        foreground=[('readonly', COLOR_TEXT_LIGHT)],
+        selectbackground=[('readonly', COLOR_DARKER_BG)],
+        selectforeground=[('readonly', COLOR_TEXT_LIGHT)]
+    )
+
 
 class GoldButton(tk.Canvas):
-    """Custom gold button widget with smooth animations for macOS"""
+    """Custom gold button widget with hover and press feedback for macOS"""
     def __init__(self, parent, text, command, width=200, height=40, font_size=12):
         super().__init__(parent, width=width, height=height, 
                         bg=COLOR_DARK_BG, highlightthickness=0, cursor="hand2")
@@ -77,12 +184,19 @@ class GoldButton(tk.Canvas):
         self.is_hovered = False
         self.is_pressed = False
         self.is_disabled = False
-        self.animation_id = None
-        self.current_scale = 1.0
-        self.target_scale = 1.0
+        self.update_id = None
         
-        # Draw button
-        self.draw_button()
+        # Draw button once; state changes only recolor these items
+        self._rect_id = self.create_rectangle(
+            2, 2, self.width - 2, self.height - 2,
+            fill=COLOR_GOLD, outline='', tags='button'
+        )
+        self._text_id = self.create_text(
+            self.width//2, self.height//2, 
+            text=self.text, fill=COLOR_BLACK, 
+            font=get_font(self.font_size, 'bold'), tags='text'
+        )
+        self._update_button()
         
         # Bind events
         self.bind('<Button-1>', self.on_press)
@@ -90,16 +204,11 @@ class GoldButton(tk.Canvas):
         self.bind('<Enter>', self.on_enter)
         self.bind('<Leave>', self.on_leave)
     
-    def draw_button(self):
-        self.delete('all')
-        
-        # Smooth scale interpolation
-        if abs(self.current_scale - self.target_scale) > 0.01:
-            self.current_scale += (self.target_scale - self.current_scale) * 0.3
-        else:
-            self.current_scale = self.target_scale
+    def _update_button(self):
+        """Recolor the existing button items to match the current state"""
+        self.update_id = None
         
-        # Determine color based on state with smooth transitions
+        # Determine color based on state
         if self.is_disabled:
             bg_color = COLOR_GOLD_DISABLED
             text_color = COLOR_TEXT_DIM
@@ -113,54 +222,23 @@ class GoldButton(tk.Canvas):
             bg_color = COLOR_GOLD  # Bright gold normal state
             text_color = COLOR_BLACK
         
-        # Calculate scaled dimensions for subtle animation
-        scale = self.current_scale
-        scaled_width = self.width * scale
-        scaled_height = self.height * scale
-        offset_x = (self.width - scaled_width) / 2
-        offset_y = (self.height - scaled_height) / 2
-        
-        # Draw rectangle with animation
-        self.create_rectangle(
-            2 + offset_x, 2 + offset_y, 
-            self.width - 2 - offset_x, self.height - 2 - offset_y,
-            fill=bg_color, outline='', tags='button'
-        )
-        
-        # Draw text
-        self.create_text(self.width//2, self.height//2, 
-                        text=self.text, fill=text_color, 
-                        font=(GOTHIC_FONT, self.font_size, 'bold'), tags='text')
+        self.itemconfigure(self._rect_id, fill=bg_color)
+        self.itemconfigure(self._text_id, fill=text_color, text=self.text)
     
-    def animate_transition(self, duration_ms=300):
-        """Smooth transition animation with 300ms duration"""
-        if self.animation_id:
-            self.after_cancel(self.animation_id)
-        
-        steps = 10
-        step_duration = duration_ms // steps
-        
-        def step(current_step):
-            if current_step < steps:
-                self.draw_button()
-                self.animation_id = self.after(step_duration, lambda: step(current_step + 1))
-            else:
-                self.draw_button()
-                self.animation_id = None
-        
-        step(0)
+    def schedule_update(self):
+        """Redraw once the event queue is idle, coalescing bursts of events"""
+        if self.update_id is None:
+            self.update_id = self.after_idle(self._update_button)
     
     def on_press(self, event):
         if not self.is_disabled:
             self.is_pressed = True
-            self.target_scale = 0.95
-            self.animate_transition(200)  # Quick press animation
+            self.schedule_update()
     
     def on_release(self, event):
         if not self.is_disabled:
             self.is_pressed = False
-            self.target_scale = 1.0 if self.is_hovered else 1.0
-            self.animate_transition(300)
+            self.schedule_update()
             if self.is_hovered and self.command:
                 # Delay command execution slightly for visual feedback
                 self.after(50, self.command)
@@ -168,14 +246,12 @@ class GoldButton(tk.Canvas):
     def on_enter(self, event):
         if not self.is_disabled:
             self.is_hovered = True
-            self.target_scale = 1.02
-            self.animate_transition(300)  # Smooth hover transition
+            self.schedule_update()
     
     def on_leave(self, event):
         self.is_hovered = False
         self.is_pressed = False
-        self.target_scale = 1.0
-        self.animate_transition(300)  # Smooth return to normal
+        self.schedule_update()
     
     def config(self, **kwargs):
         if 'state' in kwargs:
@@ -183,10 +259,117 @@ class GoldButton(tk.Canvas):
                 self.is_disabled = True
             else:
                 self.is_disabled = False
-            self.draw_button()
         if 'text' in kwargs:
             self.text = kwargs['text']
-            self.draw_button()
+        if 'state' in kwargs or 'text' in kwargs:
+            # Redraw now; any pending idle redraw would be redundant
+            if self.update_id is not None:
+                self.after_cancel(self.update_id)
+            self._update_button()
+
+
+class SpellCheckRow(ttk.Frame):
+    """Reusable row displaying one spelling error with suggestions
+    
+    SpellCheckDialog keeps a small pool of these and rebinds them to
+    whichever errors are scrolled into view.
+    """
+    def __init__(self, parent, on_apply, on_select, on_ignore):
+        super().__init__(parent, style='Row.TFrame')
+        self.error_idx = None  # Index of the error currently shown
+        
+        # Error info
+        info_frame = ttk.Frame(self, style='Input.TFrame')
+        info_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        # Misspelled word
+        word_label = ttk.Label(
+            info_frame,
+            text=f"Misspelled: ",
+            font=get_font(10),
+            style='InputDim.TLabel'
+        )
+        word_label.pack(side=tk.LEFT)
+        
+        self.word_value = ttk.Label(
+            info_frame,
+            font=get_font(10, 'bold'),
+            style='InputGold.TLabel'
+        )
+        self.word_value.pack(side=tk.LEFT)
+        
+        # Context
+        self.context_label = ttk.Label(
+            self,
+            font=get_font(9),
+            style='InputDim.TLabel',
+            wraplength=600,
+            justify=tk.LEFT
+        )
+        self.context_label.pack(fill=tk.X, padx=10, pady=2)
+        
+        # Suggestions frame
+        suggestions_frame = ttk.Frame(self, style='Input.TFrame')
+        suggestions_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        # Suggestion dropdown
+        self.suggestion_var = tk.StringVar()
+        
+        suggestion_label = ttk.Label(
+            suggestions_frame,
+            text="Suggestion:",
+            font=get_font(9),
+            style='InputLight.TLabel'
+        )
+        suggestion_label.pack(side=tk.LEFT, padx=(0, 5))
+        
+        self.suggestion_menu = ttk.Combobox(
+            suggestions_frame,
+            textvariable=self.suggestion_var,
+            state='readonly',
+            width=20,
+            style='Gold.TCombobox'
+        )
+        self.suggestion_menu.bind(
+            '<<ComboboxSelected>>',
+            lambda e: on_select(self, self.suggestion_var.get())
+        )
+        self.suggestion_menu.pack(side=tk.LEFT, padx=5)
+        
+        # Buttons
+        btn_frame = ttk.Frame(suggestions_frame, style='Input.TFrame')
+        btn_frame.pack(side=tk.RIGHT)
+        
+        # Apply button
+        self.apply_btn = GoldButton(
+            btn_frame,
+            text="Apply",
+            command=lambda: on_apply(self),
+            width=80,
+            height=30,
+            font_size=9
+        )
+        self.apply_btn.pack(side=tk.LEFT, padx=2)
+        
+        # Ignore button
+        self.ignore_btn = GoldButton(
+            btn_frame,
+            text="Ignore",
+            command=lambda: on_ignore(self),
+            width=80,
+            height=30,
+            font_size=9
+        )
+        self.ignore_btn.pack(side=tk.LEFT, padx=2)
+    
+    def set_handled(self, handled):
+        """Dim the row and disable its controls once applied or ignored"""
+        state = tk.DISABLED if handled else tk.NORMAL
+        self.configure(style='HandledRow.TFrame' if handled else 'Row.TFrame')
+        self.context_label.config(state=state)
+        self.suggestion_menu.config(state=tk.DISABLED if handled else 'readonly')
+        self.apply_btn.config(state=state)
+        self.ignore_btn.config(state=state)
 
 
 class SpellCheckDialog(tk.Toplevel):
@@ -202,6 +385,18 @@ class SpellCheckDialog(tk.Toplevel):
         self.apply_callback = apply_callback
         self.corrections = []
         self.ignored_indices = set()
+        self.applied_count = 0  # Single corrections applied so far
+        self.status_update_id = None  # Pending idle status label update
+        
+        # Chosen suggestion per error, kept here since rows are reused
+        self.selected_suggestions = [
+            error['suggestions'][0] if error['suggestions'] else ''
+            for error in errors
+        ]
+        
+        # Only rows in view exist; they are pooled and rebound on scroll
+        self.row_height = 110  # Fixed height of each error row, in pixels
+        self.rows = []  # List of (SpellCheckRow, canvas window id)
         
         # Make dialog modal
         self.transient(parent)
@@ -218,40 +413,41 @@ class SpellCheckDialog(tk.Toplevel):
     def create_widgets(self):
         """Create dialog widgets"""
         # Title
-        title_label = tk.Label(
+        title_label = ttk.Label(
             self,
             text=f"Found {len(self.errors)} spelling error(s)",
-            font=(GOTHIC_FONT, 14, "bold"),
-            bg=COLOR_DARK_BG,
-            fg=COLOR_TEXT_GOLD
+            font=get_font(14, 'bold'),
+            style='Gold.TLabel'
         )
         title_label.pack(pady=10)
         
-        # Scrollable frame for errors
-        canvas_frame = tk.Frame(self, bg=COLOR_DARK_BG)
+        # Scrollable canvas for errors, sized up front for every row
+        canvas_frame = ttk.Frame(self, style='Dark.TFrame')
         canvas_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        canvas = tk.Canvas(canvas_frame, bg=COLOR_DARK_BG, highlightthickness=0)
-        scrollbar = tk.Scrollbar(canvas_frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas, bg=COLOR_DARK_BG)
+        self.canvas = tk.Canvas(canvas_frame, bg=COLOR_DARK_BG, highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(canvas_frame, orient="vertical", command=self.canvas.yview)
         
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
+        self.canvas.configure(
+            scrollregion=(0, 0, 0, len(self.errors) * self.row_height),
+            yscrollcommand=self.on_canvas_scroll
         )
+        self.canvas.bind('<Configure>', lambda e: self.refresh_rows())
         
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
-        # Create error entries
-        for idx, error in enumerate(self.errors):
-            self.create_error_entry(scrollable_frame, idx, error)
+        # Non-modal status line for single corrections
+        self.status_label = ttk.Label(
+            self,
+            text="",
+            font=get_font(10),
+            style='Dim.TLabel'
+        )
+        self.status_label.pack()
         
         # Bottom button frame
-        button_frame = tk.Frame(self, bg=COLOR_DARK_BG)
+        button_frame = ttk.Frame(self, style='Dark.TFrame')
         button_frame.pack(pady=10)
         
         # Apply All button
@@ -276,103 +472,78 @@ class SpellCheckDialog(tk.Toplevel):
         )
         close_btn.pack(side=tk.LEFT, padx=5)
     
-    def create_error_entry(self, parent, idx, error):
-        """Create a single error entry with suggestions"""
-        entry_frame = tk.Frame(parent, bg=COLOR_INPUT_BG, relief=tk.RAISED, borderwidth=1)
-        entry_frame.pack(fill=tk.X, pady=5, padx=5)
-        
-        # Error info
-        info_frame = tk.Frame(entry_frame, bg=COLOR_INPUT_BG)
-        info_frame.pack(fill=tk.X, padx=10, pady=5)
-        
-        # Misspelled word
-        word_label = tk.Label(
-            info_frame,
-            text=f"Misspelled: ",
-            font=(GOTHIC_FONT, 10),
-            bg=COLOR_INPUT_BG,
-            fg=COLOR_TEXT_DIM
-        )
-        word_label.pack(side=tk.LEFT)
-        
-        word_value = tk.Label(
-            info_frame,
-            text=error['word'],
-            font=(GOTHIC_FONT, 10, "bold"),
-            bg=COLOR_INPUT_BG,
-            fg=COLOR_GOLD
-        )
-        word_value.pack(side=tk.LEFT)
-        
-        # Context
-        context_label = tk.Label(
-            entry_frame,
-            text=f"Context: {error['context']}",
-            font=(GOTHIC_FONT, 9),
-            bg=COLOR_INPUT_BG,
-            fg=COLOR_TEXT_DIM,
-            wraplength=600,
-            justify=tk.LEFT
-        )
-        context_label.pack(fill=tk.X, padx=10, pady=2)
-        
-        # Suggestions frame
-        suggestions_frame = tk.Frame(entry_frame, bg=COLOR_INPUT_BG)
-        suggestions_frame.pack(fill=tk.X, padx=10, pady=5)
-        
-        # Suggestion dropdown
-        suggestion_var = tk.StringVar()
-        if error['suggestions']:
-            suggestion_var.set(error['suggestions'][0])
-        
-        suggestion_label = tk.Label(
-            suggestions_frame,
-            text="Suggestion:",
-            font=(GOTHIC_FONT, 9),
-            bg=COLOR_INPUT_BG,
-            fg=COLOR_TEXT_LIGHT
-        )
-        suggestion_label.pack(side=tk.LEFT, padx=(0, 5))
-        
-        suggestion_menu = tk.OptionMenu(
-            suggestions_frame,
-            suggestion_var,
-            *error['suggestions']
-        )
-        suggestion_menu.config(
-            bg=COLOR_DARKER_BG,
-            fg=COLOR_TEXT_LIGHT,
-            activebackground=COLOR_GOLD,
-            activeforeground=COLOR_BLACK,
-            highlightthickness=0
-        )
-        suggestion_menu.pack(side=tk.LEFT, padx=5)
-        
-        # Buttons
-        btn_frame = tk.Frame(suggestions_frame, bg=COLOR_INPUT_BG)
-        btn_frame.pack(side=tk.RIGHT)
-        
-        # Apply button
-        apply_btn = GoldButton(
-            btn_frame,
-            text="Apply",
-            command=lambda: self.apply_single(idx, error, suggestion_var.get()),
-            width=80,
-            height=30,
-            font_size=9
-        )
-        apply_btn.pack(side=tk.LEFT, padx=2)
-        
-        # Ignore button
-        ignore_btn = GoldButton(
-            btn_frame,
-            text="Ignore",
-            command=lambda: self.ignore_single(idx, entry_frame),
-            width=80,
-            height=30,
-            font_size=9
-        )
-        ignore_btn.pack(side=tk.LEFT, padx=2)
+    def on_canvas_scroll(self, first, last):
+        """Keep the scrollbar in sync and rebind rows for the new view"""
+        self.scrollbar.set(first, last)
+        self.refresh_rows()
+    
+    def refresh_rows(self):
+        """Position pooled rows over the visible errors and hide the rest"""
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        
+        # Enough rows to cover the view even when partially scrolled
+        pool_size = height // self.row_height + 2
+        if len(self.rows) < pool_size:
+            while len(self.rows) < pool_size:
+                row = SpellCheckRow(self.canvas, self.apply_row,
+                                    self.select_suggestion, self.ignore_row)
+                window_id = self.canvas.create_window(
+                    5, 0, anchor="nw", window=row,
+                    height=self.row_height - 10, state='hidden'
+                )
+                self.rows.append((row, window_id))
+            # Row/error pairing depends on the pool size
+            for row, _ in self.rows:
+                row.error_idx = None
+        
+        top = int(self.canvas.canvasy(0))
+        first = max(0, top // self.row_height)
+        last = min(len(self.errors), (top + height) // self.row_height + 1)
+        
+        shown = set()
+        for error_idx in range(first, last):
+            slot = error_idx % len(self.rows)
+            row, window_id = self.rows[slot]
+            if row.error_idx != error_idx:
+                self._bind_row(row, error_idx)
+            self.canvas.coords(window_id, 5, error_idx * self.row_height)
+            self.canvas.itemconfigure(window_id, width=max(1, width - 10), state='normal')
+            shown.add(slot)
+        
+        for slot, (row, window_id) in enumerate(self.rows):
+            if slot not in shown:
+                self.canvas.itemconfigure(window_id, state='hidden')
+    
+    def _bind_row(self, row, error_idx):
+        """Point a pooled row at a different error"""
+        error = self.errors[error_idx]
+        row.error_idx = error_idx
+        row.word_value.config(text=error['word'])
+        row.context_label.config(text=f"Context: {error['context']}")
+        
+        row.suggestion_menu.config(values=error['suggestions'])
+        row.suggestion_var.set(self.selected_suggestions[error_idx])
+        row.set_handled(error_idx in self.ignored_indices)
+    
+    def select_suggestion(self, row, suggestion):
+        """Remember the suggestion picked in a row's dropdown"""
+        self.selected_suggestions[row.error_idx] = suggestion
+    
+    def apply_row(self, row):
+        """Apply the suggestion chosen in a row"""
+        idx = row.error_idx
+        self.apply_single(idx, self.errors[idx], self.selected_suggestions[idx])
+    
+    def ignore_row(self, row):
+        """Ignore the error shown in a row"""
+        self.ignore_single(row.error_idx)
+    
+    def _mark_handled(self, idx):
+        """Dim the row showing an error, if it is in view"""
+        for row, _ in self.rows:
+            if row.error_idx == idx:
+                row.set_handled(True)
     
     def apply_single(self, idx, error, replacement):
         """Apply a single correction"""
@@ -383,25 +554,26 @@ class SpellCheckDialog(tk.Toplevel):
                 'replacement': replacement
             })
             self.ignored_indices.add(idx)
+            self._mark_handled(idx)
             
-            # Apply immediately
-            self.apply_callback([self.corrections[-1]])
+            # Apply immediately, rebuilding from the original text since
+            # error offsets refer to it
+            self.apply_callback(apply_text_corrections(self.original_text, self.corrections))
             
-            # Update display
-            messagebox.showinfo("Applied", f"Replaced '{error['word']}' with '{replacement}'")
+            # Update display without blocking on a popup
+            self.applied_count += 1
+            if self.status_update_id is None:
+                self.status_update_id = self.after_idle(self.update_status)
+    
+    def update_status(self):
+        """Show how many single corrections have been applied"""
+        self.status_update_id = None
+        self.status_label.config(text=f"Replaced {self.applied_count} word(s)")
     
-    def ignore_single(self, idx, frame):
+    def ignore_single(self, idx):
         """Ignore a single error"""
         self.ignored_indices.add(idx)
-        frame.configure(bg=COLOR_DARKER_BG)
-        
-        # Disable all widgets in frame
-        for widget in frame.winfo_children():
-            if hasattr(widget, 'config'):
-                try:
-                    widget.config(state=tk.DISABLED)
-                except:
-                    pass
+        self._mark_handled(idx)
     
     def apply_all(self):
         """Apply all corrections at once"""
@@ -416,7 +588,12 @@ class SpellCheckDialog(tk.Toplevel):
                 })
         
         if corrections_to_apply:
-            self.apply_callback(corrections_to_apply)
+            # Keep any single corrections applied earlier
+            self.apply_callback(apply_text_corrections(
+                self.original_text, self.corrections + corrections_to_apply
+            ))
+            messagebox.showinfo("Corrections Applied", 
+                              f"{len(corrections_to_apply)} correction(s) applied successfully!")
             self.destroy()
         else:
             messagebox.showinfo("No Corrections", "No corrections to apply.")
@@ -436,21 +613,38 @@ class AIPromptGenerator:
         
         # Initialize managers
         self.history_manager = HistoryManager()
+        self.history_list_limit = 50  # Entries shown in the history listbox
+        self._select_after = None  # Pending debounced selection handler
         
         # Current state
         self.last_generated_prompt = ""
         
         # Prompt cache for consistency
-        self.prompt_cache = {}  # Maps input text -> generated prompt
+        self.prompt_cache = PromptCache()  # Normalized input -> prompt, for context-free requests
+        self.response_cache = ResponseCache()  # Maps hashed full request -> response, on disk
         self.last_input_text = ""  # Track last input
+        self._input_cache = ""  # Stripped input text, reread only after edits
+        self._input_dirty = True
         
         # Conversation memory for context persistence
-        self.conversation_history = []  # List of {role: str, content: str} messages
         self.conversation_file = None  # Will be set after init
         self.max_conversation_turns = 50  # Keep last 50 turns
-        
-        # Initialize Perplexity client
-        self.init_perplexity_client()
+        # Extra turns allowed before trimming, so the history prefix sent to
+        # the API (and cached by the provider) changes only every few turns
+        self.conversation_trim_slack = 10
+        self.conversation_generation = 0  # Bumped whenever the history is replaced
+        self.set_conversation([])  # Deque of {role: str, content: str} messages
+        
+        # AI client, set up once the window is showing (see init_clients)
+        self.client = None
+        self.client_type = None
+        self.model = None
+        self.summary_model = None
+        
+        # Optional local GGUF model (llama-cpp-python) used as the fallback
+        self.local_model_path = os.getenv('VELOXMIND_LOCAL_MODEL')
+        self.local_model = None  # Loaded on first use; False if unavailable
+        self.local_model_lock = threading.Lock()  # Llama is not thread-safe
         
         # Initialize spell checker
         self.init_spell_checker()
@@ -458,27 +652,75 @@ class AIPromptGenerator:
         # Initialize conversation memory
         self.init_conversation_memory()
         
+        # API calls run on worker threads; finished generations are queued
+        # and picked up on the Tk thread via the <<GenerationDone>> event
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.pending_results = queue.Queue()
+        self.root.bind('<<GenerationDone>>', self.on_generation_done)
+        
+        # Streamed output chunks are queued by workers and written to
+        # output_text in one insert per flush, about 30 times a second
+        self.output_chunks = queue.Queue()
+        self.output_flush_ms = 33
+        self.output_flush_id = None
+        
         # Create GUI elements
+        configure_styles(self.root)
         self.create_widgets()
+        
+        # History is written behind in the background; drain it on close
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Importing an SDK and creating its client is slow, so wait until
+        # the window has painted
+        self.root.after_idle(self.init_clients)
+    
+    def init_clients(self):
+        """Initialize the AI client and resume work that needs it"""
+        self.init_perplexity_client()
+        
+        # Resume polling batch jobs submitted in earlier sessions
+        self.init_batch_jobs()
+    
+    def on_close(self):
+        """Finish pending history writes, then close the window"""
+        self.history_manager.flush()
+        self.root.destroy()
     
     def init_perplexity_client(self):
-        """Initialize the AI API client (OpenAI or Anthropic)"""
+        """Initialize the AI API client (OpenAI or Anthropic)
+        
+        SDKs are imported only for a provider with a key configured, since
+        they are slow to import.
+        """
         try:
             # Try OpenAI first (primary)
             openai_key = os.getenv('OPENAI_API_KEY')
-            if openai_key and OpenAI is not None:
-                self.client = OpenAI(api_key=openai_key)
-                self.client_type = 'openai'
-                self.model = 'gpt-4o-mini'  # Fast and cost-effective
-                return
+            if openai_key:
+                try:
+                    from openai import OpenAI
+                except ImportError:
+                    pass
+                else:
+                    self.client = OpenAI(api_key=openai_key)
+                    self.client_type = 'openai'
+                    self.model = 'gpt-4o-mini'  # Fast and cost-effective
+                    self.summary_model = 'gpt-4o-mini'
+                    return
             
             # Try Anthropic as fallback
             anthropic_key = os.getenv('ANTHROPIC_API_KEY')
-            if anthropic_key and Anthropic is not None:
-                self.client = Anthropic(api_key=anthropic_key)
-                self.client_type = 'anthropic'
-                self.model = 'claude-3-5-sonnet-20241022'
-                return
+            if anthropic_key:
+                try:
+                    from anthropic import Anthropic
+                except ImportError:
+                    pass
+                else:
+                    self.client = Anthropic(api_key=anthropic_key)
+                    self.client_type = 'anthropic'
+                    self.model = 'claude-3-5-sonnet-20241022'
+                    self.summary_model = 'claude-3-5-haiku-20241022'
+                    return
             
             # No API keys found
             if not openai_key and not anthropic_key:
@@ -488,7 +730,7 @@ class AIPromptGenerator:
                     "Set OPENAI_API_KEY or ANTHROPIC_API_KEY in your environment.\n\n"
                     "You can still use the app, but generation will use simple fallback."
                 )
-            elif OpenAI is None and Anthropic is None:
+            else:
                 messagebox.showerror(
                     "Package Missing",
                     "Neither 'openai' nor 'anthropic' package is installed.\n\n"
@@ -501,6 +743,7 @@ class AIPromptGenerator:
             self.client = None
             self.client_type = None
             self.model = None
+            self.summary_model = None
             
         except Exception as e:
             messagebox.showerror("Initialization Error", 
@@ -508,80 +751,252 @@ class AIPromptGenerator:
             self.client = None
             self.client_type = None
             self.model = None
+            self.summary_model = None
     
     def init_spell_checker(self):
-        """Initialize the spell checker"""
-        if SpellChecker is None:
-            self.spell_checker = None
-        else:
+        """Initialize the spell checker; its dictionary loads on first use"""
+        # Suggestions per lowercased misspelling, reused across checks
+        self.get_suggestions = functools.lru_cache(maxsize=4096)(self._find_suggestions)
+        self.spell_checker = None
+        self.spell_checker_loaded = False
+    
+    def get_spell_checker(self):
+        """Get the spell checker, importing and building it on first call"""
+        if not self.spell_checker_loaded:
+            self.spell_checker_loaded = True
             try:
+                from spellchecker import SpellChecker
                 self.spell_checker = SpellChecker()
             except Exception as e:
                 self.spell_checker = None
+        return self.spell_checker
     
     def init_conversation_memory(self):
         """Initialize conversation memory system"""
         # Set up conversation file path
-        home = os.path.expanduser('~')
-        conversation_dir = os.path.join(home, '.veloxmind_studio')
-        os.makedirs(conversation_dir, exist_ok=True)
-        self.conversation_file = os.path.join(conversation_dir, 'conversation.json')
+        conversation_dir = Path.home() / '.veloxmind_studio'
+        conversation_dir.mkdir(parents=True, exist_ok=True)
+        # JSON Lines log, one message per line, appended to on every message
+        self.conversation_file = conversation_dir / 'conversation.jsonl'
+        self.legacy_conversation_file = conversation_dir / 'conversation.json'
+        self.conversation_log_lines = 0  # Messages currently in the log
+        # Rolling summary of turns trimmed from the history
+        self.summary_file = conversation_dir / 'conversation_summary.txt'
         
         # Load existing conversation if available
         self.load_conversation()
+        self.load_conversation_summary()
+    
+    def set_conversation(self, messages):
+        """Replace the conversation history, keeping only the last N turns"""
+        # Bounded so old messages can never pile up; add_to_conversation
+        # trims in blocks before the bound is reached
+        maxlen = (self.max_conversation_turns + self.conversation_trim_slack) * 2
+        self.conversation_history = deque(messages, maxlen=maxlen)
+        # Anything still in flight for the previous history is now stale
+        self.conversation_generation += 1
+        
+        # Keep last N turns (each turn = user + assistant message)
+        max_messages = self.max_conversation_turns * 2
+        while len(self.conversation_history) > max_messages:
+            self.conversation_history.popleft()
+        self.drop_leading_replies()
+        
+        # Counted once here, then kept up to date as messages come and go
+        self.user_turn_count = sum(1 for m in self.conversation_history
+                                   if m['role'] == 'user')
+    
+    def drop_leading_replies(self) -> list:
+        """Drop assistant messages left at the start by trimming
+        
+        Anthropic requires the first message to come from the user.
+        """
+        history = self.conversation_history
+        dropped = []
+        while history and history[0]['role'] != 'user':
+            dropped.append(history.popleft())
+        return dropped
     
     def load_conversation(self):
         """Load conversation history from file"""
-        if not os.path.exists(self.conversation_file):
-            self.conversation_history = []
-            return
+        self.conversation_log_lines = 0
+        self.conversation_load_failed = False
+        messages = []
+        try:
+            # Opening directly avoids a separate exists() check
+            with self.conversation_file.open('rb') as f:
+                lines = [line for line in f if line.strip()]
+        except FileNotFoundError:
+            if self.legacy_conversation_file.exists():
+                self.load_legacy_conversation()
+                return
+            lines = []
+        except Exception as e:
+            # Leave the log alone rather than compacting it down to nothing
+            print(f"Error loading conversation: {e}")
+            self.conversation_load_failed = True
+            lines = []
+        
+        # Parse line by line so a partial line left by a crash only costs
+        # that message
+        for line in lines:
+            try:
+                message = loads_json(line)
+                messages.append({'role': message['role'], 'content': message['content']})
+            except Exception as e:
+                print(f"Skipping unreadable conversation line: {e}")
+        self.conversation_log_lines = len(lines)
         
+        self.set_conversation(messages)
+        
+        # Rewrite without the bad lines, so new messages aren't appended
+        # onto a partial one
+        if len(messages) < len(lines):
+            self.save_conversation()
+    
+    def load_legacy_conversation(self):
+        """Migrate a conversation saved by older versions as one JSON document"""
         try:
-            with open(self.conversation_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            self.conversation_history = data.get('messages', [])
+            with self.legacy_conversation_file.open('rb') as f:
+                data = loads_json(f.read())
+            self.set_conversation(data.get('messages', []))
         except Exception as e:
             print(f"Error loading conversation: {e}")
-            self.conversation_history = []
+            self.set_conversation([])
+            return
+        
+        self.save_conversation()
     
     def save_conversation(self):
-        """Save conversation history to file"""
+        """Rewrite the conversation log from memory"""
+        if self.conversation_load_failed:
+            return
         try:
-            # Trim conversation if too long
-            if len(self.conversation_history) > self.max_conversation_turns * 2:
-                # Keep last N turns (each turn = user + assistant message)
-                self.conversation_history = self.conversation_history[-(self.max_conversation_turns * 2):]
-            
-            data = {
-                'version': '1.0',
-                'last_updated': datetime.now().isoformat(),
-                'messages': self.conversation_history
-            }
-            with open(self.conversation_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            payload = b''.join(dumps_json(message) + b'\n'
+                               for message in self.conversation_history)
+            with self.conversation_file.open('wb') as f:
+                f.write(payload)
+            self.conversation_log_lines = len(self.conversation_history)
         except Exception as e:
             print(f"Error saving conversation: {e}")
     
     def add_to_conversation(self, role: str, content: str):
         """Add a message to conversation history"""
-        self.conversation_history.append({
+        message = {
             'role': role,
             'content': content
-        })
-        self.save_conversation()
+        }
+        history = self.conversation_history
+        if len(history) == history.maxlen and history[0]['role'] == 'user':
+            self.user_turn_count -= 1  # About to be evicted by the append
+        history.append(message)
+        if role == 'user':
+            self.user_turn_count += 1
+        
+        # Trim conversation if too long, in blocks rather than one message
+        # at a time so the cached prefix survives most turns
+        max_messages = self.max_conversation_turns * 2
+        if len(history) == history.maxlen:
+            # Keep last N turns (each turn = user + assistant message)
+            dropped = []
+            while len(history) > max_messages:
+                dropped.append(history.popleft())
+                if dropped[-1]['role'] == 'user':
+                    self.user_turn_count -= 1
+            dropped += self.drop_leading_replies()
+            
+            # Fold the trimmed turns into the summary in the background
+            if self.client:
+                generation = self.conversation_generation
+                self.run_in_background(
+                    self.summarize_turns, dropped, self.conversation_summary,
+                    on_done=lambda f: self.finish_summary(f, generation)
+                )
+        
+        try:
+            with self.conversation_file.open('ab') as f:
+                f.write(dumps_json(message) + b'\n')
+            self.conversation_log_lines += 1
+        except Exception as e:
+            print(f"Error saving conversation: {e}")
+        
+        # Compact the log once it holds several times what is kept
+        if self.conversation_log_lines > max_messages * 4:
+            self.save_conversation()
     
     def clear_conversation(self):
         """Clear conversation history"""
-        self.conversation_history = []
+        self.conversation_load_failed = False  # Clearing discards the old log too
+        self.set_conversation([])
         self.save_conversation()
+        self.save_conversation_summary(None)
+    
+    def load_conversation_summary(self):
+        """Load the rolling summary of trimmed turns"""
+        try:
+            self.conversation_summary = self.summary_file.read_text(encoding='utf-8') or None
+        except FileNotFoundError:
+            self.conversation_summary = None
+        except Exception as e:
+            print(f"Error loading conversation summary: {e}")
+            self.conversation_summary = None
+    
+    def save_conversation_summary(self, summary: Optional[str]):
+        """Set and save the rolling summary of trimmed turns"""
+        self.conversation_summary = summary
+        try:
+            self.summary_file.write_text(summary or '', encoding='utf-8')
+        except Exception as e:
+            print(f"Error saving conversation summary: {e}")
+    
+    def summarize_turns(self, messages: list, earlier_summary: Optional[str]) -> Optional[str]:
+        """Merge trimmed messages into a new summary, or None on failure (runs on a worker thread)"""
+        transcript = '\n\n'.join(f"{m['role']}: {m['content']}" for m in messages)
+        if earlier_summary:
+            transcript = f"Earlier summary:\n{earlier_summary}\n\n{transcript}"
+        request = [{'role': 'user', 'content': transcript}]
+        
+        # The same trimmed turns always give the same summary
+        key = ResponseCache.make_key(self.summary_model, SUMMARY_PROMPT, request)
+        summary = self.response_cache.get(key)
+        if summary is None:
+            try:
+                if self.client_type == 'openai':
+                    response = self.client.chat.completions.create(
+                        model=self.summary_model,
+                        messages=[{"role": "system", "content": SUMMARY_PROMPT}, *request],
+                        max_completion_tokens=400
+                    )
+                    summary = response.choices[0].message.content
+                elif self.client_type == 'anthropic':
+                    response = self.client.messages.create(
+                        model=self.summary_model,
+                        max_tokens=400,
+                        system=SUMMARY_PROMPT,
+                        messages=request
+                    )
+                    summary = response.content[0].text
+                else:
+                    return None
+            except Exception as e:
+                print(f"Error summarizing conversation: {e}")
+                return None
+            self.response_cache.put(key, summary)
+        
+        return summary
+    
+    def finish_summary(self, future, generation: int):
+        """Save a finished summary unless the conversation was cleared or replaced meanwhile"""
+        summary = future.result()
+        if summary is not None and generation == self.conversation_generation:
+            self.save_conversation_summary(summary)
     
     def get_conversation_summary(self) -> str:
         """Get a summary of the conversation for display"""
         if not self.conversation_history:
             return "No conversation context"
         
-        turn_count = len([m for m in self.conversation_history if m['role'] == 'user'])
-        return f"{turn_count} turn(s) in context"
+        return f"{self.user_turn_count} turn(s) in context"
     
     def clear_conversation_ui(self):
         """Clear conversation context and update UI"""
@@ -594,6 +1009,14 @@ class AIPromptGenerator:
         else:
             messagebox.showinfo("No Context", "No conversation context to clear.")
     
+    def clear_cache_ui(self):
+        """Clear cached responses so the next requests go to the API"""
+        if messagebox.askyesno("Clear Cache", 
+                              "Clear cached responses? Repeated requests will be sent to the AI again."):
+            self.prompt_cache.clear()
+            self.response_cache.clear()
+            messagebox.showinfo("Cache Cleared", "Cached responses have been cleared.")
+    
     def update_context_status(self):
         """Update the context status label"""
         if hasattr(self, 'context_status_label'):
@@ -603,50 +1026,47 @@ class AIPromptGenerator:
         """Create and layout all GUI widgets"""
         
         # Main container with two columns
-        main_container = tk.Frame(self.root, bg=self.bg_color)
+        main_container = ttk.Frame(self.root, style='Dark.TFrame')
         main_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
         # Left panel (main content)
-        left_panel = tk.Frame(main_container, bg=self.bg_color)
+        left_panel = ttk.Frame(main_container, style='Dark.TFrame')
         left_panel.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 5))
         
         # Right panel (history)
-        right_panel = tk.Frame(main_container, bg=self.bg_color, width=250)
+        right_panel = ttk.Frame(main_container, style='Dark.TFrame', width=250)
         right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, padx=(5, 0))
         right_panel.pack_propagate(False)
         
         # === LEFT PANEL ===
         
         # Title Label
-        title_label = tk.Label(
+        title_label = ttk.Label(
             left_panel,
             text="VeloxMind Studio",
-            font=(TITLE_FONT, 18, "bold"),
-            bg=self.bg_color,
-            fg=self.text_color
+            font=get_font(18, 'bold', TITLE_FONT),
+            style='Light.TLabel'
         )
         title_label.pack(pady=(0, 10))
         
         # Subtitle
-        subtitle_label = tk.Label(
+        subtitle_label = ttk.Label(
             left_panel,
             text="AI Assistant with Conversation Memory - remembers context across prompts",
-            font=(GOTHIC_FONT, 10),
-            bg=self.bg_color,
-            fg=COLOR_TEXT_GOLD
+            font=get_font(10),
+            style='Gold.TLabel'
         )
         subtitle_label.pack(pady=(0, 15))
         
         # Input Frame
-        input_frame = tk.Frame(left_panel, bg=self.bg_color)
+        input_frame = ttk.Frame(left_panel, style='Dark.TFrame')
         input_frame.pack(pady=10, fill=tk.BOTH, expand=True)
         
-        input_label = tk.Label(
+        input_label = ttk.Label(
             input_frame,
             text="Your Task/Idea:",
-            font=(GOTHIC_FONT, 11, "bold"),
-            bg=self.bg_color,
-            fg=self.text_color
+            font=get_font(11, 'bold'),
+            style='Light.TLabel'
         )
         input_label.pack(anchor=tk.W)
         
@@ -654,7 +1074,7 @@ class AIPromptGenerator:
         self.input_text = scrolledtext.ScrolledText(
             input_frame,
             height=6,
-            font=(GOTHIC_FONT, 11),
+            font=get_font(11),
             bg=COLOR_INPUT_BG,
             fg=self.text_color,
             insertbackground=COLOR_GOLD,
@@ -664,9 +1084,10 @@ class AIPromptGenerator:
             wrap=tk.WORD
         )
         self.input_text.pack(fill=tk.BOTH, expand=True, pady=5)
+        self.input_text.bind('<<Modified>>', self._on_input_modified)
         
         # Control buttons
-        control_frame = tk.Frame(left_panel, bg=self.bg_color)
+        control_frame = ttk.Frame(left_panel, style='Dark.TFrame')
         control_frame.pack(pady=10)
         
         # Generate Button
@@ -713,16 +1134,23 @@ class AIPromptGenerator:
         )
         self.clear_button.pack(side=tk.LEFT, padx=5)
         
+        # Progress indicator, animated while a generation is running
+        self.progress_bar = ttk.Progressbar(
+            left_panel,
+            mode='indeterminate',
+            style='Gold.Horizontal.TProgressbar'
+        )
+        self.progress_bar.pack(fill=tk.X)
+        
         # Output Frame
-        output_frame = tk.Frame(left_panel, bg=self.bg_color)
+        output_frame = ttk.Frame(left_panel, style='Dark.TFrame')
         output_frame.pack(pady=10, fill=tk.BOTH, expand=True)
         
-        output_label = tk.Label(
+        output_label = ttk.Label(
             output_frame,
             text="Generated Prompt:",
-            font=(GOTHIC_FONT, 11, "bold"),
-            bg=self.bg_color,
-            fg=self.text_color
+            font=get_font(11, 'bold'),
+            style='Light.TLabel'
         )
         output_label.pack(anchor=tk.W)
         
@@ -730,7 +1158,7 @@ class AIPromptGenerator:
         self.output_text = scrolledtext.ScrolledText(
             output_frame,
             height=12,
-            font=(GOTHIC_FONT, 10),
+            font=get_font(10),
             bg=COLOR_INPUT_BG,
             fg=self.text_color,
             insertbackground=COLOR_GOLD,
@@ -743,7 +1171,7 @@ class AIPromptGenerator:
         self.output_text.pack(fill=tk.BOTH, expand=True, pady=5)
         
         # Button Frame for additional actions
-        button_frame = tk.Frame(left_panel, bg=self.bg_color)
+        button_frame = ttk.Frame(left_panel, style='Dark.TFrame')
         button_frame.pack(pady=10)
         
         # Copy Button
@@ -782,25 +1210,23 @@ class AIPromptGenerator:
         # === RIGHT PANEL (Conversation Context & History) ===
         
         # Conversation Context Section
-        context_section = tk.Frame(right_panel, bg=self.bg_color)
+        context_section = ttk.Frame(right_panel, style='Dark.TFrame')
         context_section.pack(pady=(0, 10), fill=tk.X)
         
-        context_title = tk.Label(
+        context_title = ttk.Label(
             context_section,
             text="Conversation Context",
-            font=(GOTHIC_FONT, 12, "bold"),
-            bg=self.bg_color,
-            fg=COLOR_TEXT_GOLD
+            font=get_font(12, 'bold'),
+            style='Gold.TLabel'
         )
         context_title.pack(pady=(0, 5))
         
         # Context status label
-        self.context_status_label = tk.Label(
+        self.context_status_label = ttk.Label(
             context_section,
             text=self.get_conversation_summary(),
-            font=(GOTHIC_FONT, 9),
-            bg=self.bg_color,
-            fg=COLOR_TEXT_DIM
+            font=get_font(9),
+            style='Dim.TLabel'
         )
         self.context_status_label.pack(pady=(0, 5))
         
@@ -815,24 +1241,34 @@ class AIPromptGenerator:
         )
         clear_context_btn.pack(pady=5)
         
+        # Clear cache button
+        clear_cache_btn = GoldButton(
+            context_section,
+            text="Clear Cache",
+            command=self.clear_cache_ui,
+            width=150,
+            height=30,
+            font_size=9
+        )
+        clear_cache_btn.pack(pady=5)
+        
         # Separator
-        separator = tk.Frame(right_panel, bg=COLOR_BORDER, height=2)
+        separator = ttk.Frame(right_panel, style='Border.TFrame', height=2)
         separator.pack(fill=tk.X, pady=10)
         
-        history_title = tk.Label(
+        history_title = ttk.Label(
             right_panel,
             text="History",
-            font=(GOTHIC_FONT, 14, "bold"),
-            bg=self.bg_color,
-            fg=self.text_color
+            font=get_font(14, 'bold'),
+            style='Light.TLabel'
         )
         history_title.pack(pady=(0, 10))
         
         # History listbox with scrollbar
-        history_list_frame = tk.Frame(right_panel, bg=self.bg_color)
+        history_list_frame = ttk.Frame(right_panel, style='Dark.TFrame')
         history_list_frame.pack(fill=tk.BOTH, expand=True, pady=5)
         
-        history_scrollbar = tk.Scrollbar(history_list_frame)
+        history_scrollbar = ttk.Scrollbar(history_list_frame)
         history_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         self.history_listbox = tk.Listbox(
@@ -841,9 +1277,11 @@ class AIPromptGenerator:
             fg=self.text_color,
             selectbackground=COLOR_GOLD,
             selectforeground=COLOR_BLACK,
-            font=(GOTHIC_FONT, 9),
+            font=get_font(9),
             yscrollcommand=history_scrollbar.set,
-            activestyle='none'
+            activestyle='none',
+            exportselection=False,  # Keep the selection when text is selected elsewhere
+            selectmode=tk.EXTENDED
         )
         self.history_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         history_scrollbar.config(command=self.history_listbox.yview)
@@ -851,7 +1289,7 @@ class AIPromptGenerator:
         self.history_listbox.bind('<<ListboxSelect>>', self.on_history_select)
         
         # History buttons
-        history_btn_frame = tk.Frame(right_panel, bg=self.bg_color)
+        history_btn_frame = ttk.Frame(right_panel, style='Dark.TFrame')
         history_btn_frame.pack(pady=10)
         
         load_btn = GoldButton(
@@ -884,6 +1322,17 @@ class AIPromptGenerator:
         )
         clear_hist_btn.pack(side=tk.LEFT, padx=2)
         
+        # Regenerate every selected entry through the provider's Batch API
+        regenerate_btn = GoldButton(
+            right_panel,
+            text="Regenerate Selected",
+            command=self.regenerate_batch,
+            width=150,
+            height=30,
+            font_size=9
+        )
+        regenerate_btn.pack(pady=(0, 10))
+        
         # Load history into listbox
         self.refresh_history_list()
     
@@ -892,17 +1341,15 @@ class AIPromptGenerator:
         # Strip whitespace
         text = text.strip()
         
-        # Normalize line breaks
-        text = text.replace('\r\n', '\n').replace('\r', '\n')
+        # Normalize line breaks and remove control characters
+        text = text.replace('\r\n', '\n').translate(SANITIZE_TABLE)
         
         # Remove excessive whitespace
-        lines = text.split('\n')
-        lines = [line.strip() for line in lines]
-        text = '\n'.join(lines)
+        text = MULTI_SPACE_PATTERN.sub(' ', text)
+        text = LINE_EDGE_SPACE_PATTERN.sub('\n', text)
         
         # Remove multiple consecutive blank lines
-        while '\n\n\n' in text:
-            text = text.replace('\n\n\n', '\n\n')
+        text = BLANK_LINES_PATTERN.sub('\n\n', text)
         
         return text
     
@@ -911,14 +1358,74 @@ class AIPromptGenerator:
         Simplified fallback prompt builder - concise and AI-optimized.
         Used when ML generation is unavailable.
         """
+        # Use the local model when one is configured
+        local_model = self.get_local_model()
+        if local_model is not None:
+            try:
+                with self.local_model_lock:
+                    response = local_model.create_chat_completion(
+                        messages=[
+                            {"role": "system", "content": SYSTEM_PROMPT},
+                            {"role": "user", "content": user_input}
+                        ],
+                        max_tokens=1024
+                    )
+                local_prompt = response['choices'][0]['message']['content'].strip()
+                if local_prompt:
+                    return local_prompt
+            except Exception as e:
+                print(f"Local model error: {e}")
+        
         # Return user input as-is, keeping it simple
         return user_input
     
+    def get_local_model(self):
+        """Get the local llama.cpp model, loading it on first use
+        
+        Returns None if VELOXMIND_LOCAL_MODEL is unset or llama-cpp-python
+        is not installed.
+        """
+        if not self.local_model_path:
+            return None
+        with self.local_model_lock:
+            if self.local_model is None:
+                try:
+                    from llama_cpp import Llama, LlamaRAMCache
+                    self.local_model = Llama(
+                        model_path=self.local_model_path,
+                        n_ctx=2048,
+                        n_threads=os.cpu_count(),
+                        use_mmap=True,
+                        verbose=False
+                    )
+                    # Reuse the KV state of the shared system prompt prefix
+                    self.local_model.set_cache(LlamaRAMCache())
+                except Exception as e:
+                    print(f"Local model unavailable: {e}")
+                    self.local_model = False
+            return self.local_model or None
+    
+    def _on_input_modified(self, event):
+        """Mark the cached input text stale when the input is edited"""
+        # Also fires when input_content resets the flag; ignore that
+        if self.input_text.edit_modified():
+            self._input_dirty = True
+    
+    @property
+    def input_content(self) -> str:
+        """Get the stripped input text, reading the widget only after edits"""
+        # <<Modified>> is delivered from the event queue, so check the flag
+        # too in case the text was changed earlier in this same callback
+        if self._input_dirty or self.input_text.edit_modified():
+            self._input_cache = self.input_text.get("1.0", tk.END).strip()
+            self._input_dirty = False
+            self.input_text.edit_modified(False)
+        return self._input_cache
+    
     def generate_prompt(self):
         """Generate an optimized prompt using ML"""
         # Get and validate input text
-        user_input = self.input_text.get("1.0", tk.END)
-        user_input = self.validate_and_sanitize_input(user_input)
+        user_input = self.validate_and_sanitize_input(self.input_content)
         
         if not user_input:
             messagebox.showwarning("Input Required", 
@@ -926,7 +1433,7 @@ class AIPromptGenerator:
             return
         
         # Check if API client is available
-        if not self.client:
+        if not self.client and not self.local_model_path:
             messagebox.showwarning(
                 "API Not Available",
                 "Perplexity API is not configured. Using rule-based generation instead."
@@ -936,14 +1443,65 @@ class AIPromptGenerator:
             self.display_prompt(final_prompt, user_input)
             return
         
-        # Use ML to generate the prompt
-        self.generate_button.config(state=tk.DISABLED, text="Generating...")
-        self.root.update()
-        
+        # Use ML (or the local model) to generate the prompt; the request
+        # is built here so the worker never reads conversation state
+        request = self.build_ml_request(user_input)
+        self.set_generating(True)
+        self.begin_output_stream()
+        self.run_in_background(
+            self.generate_ml_prompt, request, self.queue_output,
+            on_done=lambda f: self.finish_ml_prompt(f, request)
+        )
+    
+    def set_generating(self, generating: bool):
+        """Show or clear the busy state while a generation is running"""
+        if generating:
+            self.generate_button.config(state=tk.DISABLED, text="Generating...")
+            self.progress_bar.start(15)
+        else:
+            self.progress_bar.stop()
+            self.generate_button.config(state=tk.NORMAL, text="Generate Prompt")
+    
+    def run_in_background(self, func, *args, on_done):
+        """Call func on a worker thread, then on_done(future) on the Tk thread"""
+        future = self.executor.submit(func, *args)
+        future.add_done_callback(lambda f: self.on_generation_complete(f, on_done))
+        return future
+    
+    def on_generation_complete(self, future, on_done):
+        """Hand a finished call to the Tk thread (runs on the worker)"""
+        self.pending_results.put((future, on_done))
         try:
-            # Use Perplexity to intelligently analyze and generate prompt
-            ml_prompt = self.generate_ml_prompt(user_input)
+            self.root.event_generate('<<GenerationDone>>', when='tail')
+        except (tk.TclError, RuntimeError):
+            # Window was closed while the request was in flight
+            pass
+    
+    def on_generation_done(self, event):
+        """Run the handlers of finished calls (runs on the Tk thread)"""
+        while True:
+            try:
+                future, on_done = self.pending_results.get_nowait()
+            except queue.Empty:
+                break
+            on_done(future)
+    
+    def finish_ml_prompt(self, future, request: dict):
+        """Display a finished ML generation and record the turn"""
+        self.end_output_stream()
+        user_input = request['user_input']
+        try:
+            ml_prompt, source = future.result()
+            if source == 'truncated':
+                # Incomplete, so kept out of history, context and the caches
+                self.display_prompt(ml_prompt, user_input, save=False)
+                messagebox.showwarning("Response Truncated",
+                                       "The response hit the output token limit and is incomplete. "
+                                       "It was not saved to history.")
+                return
             self.display_prompt(ml_prompt, user_input)
+            if source != 'fallback':
+                self.record_turn(request, ml_prompt, source)
         except Exception as e:
             messagebox.showerror("Generation Error", 
                                f"ML generation failed: {str(e)}\n\nUsing rule-based fallback.")
@@ -951,10 +1509,53 @@ class AIPromptGenerator:
             final_prompt = self.build_universal_prompt(user_input)
             self.display_prompt(final_prompt, user_input)
         finally:
-            self.generate_button.config(state=tk.NORMAL, text="Generate Prompt")
+            self.set_generating(False)
     
-    def display_prompt(self, prompt: str, user_input: str):
-        """Display the generated prompt and save to history"""
+    def begin_output_stream(self):
+        """Clear the output area and start flushing queued chunks into it"""
+        self.output_text.config(state=tk.NORMAL)
+        self.output_text.delete("1.0", tk.END)
+        self.output_text.config(state=tk.DISABLED)
+        
+        # One undo separator for the whole response instead of one per insert
+        self.output_text['autoseparators'] = False
+        if self.output_flush_id is None:
+            self.output_flush_id = self.root.after(self.output_flush_ms, self._flush_output)
+    
+    def queue_output(self, chunk: str):
+        """Queue a streamed chunk for display (safe to call from any thread)"""
+        self.output_chunks.put(chunk)
+    
+    def _flush_output(self, reschedule: bool = True):
+        """Write every queued chunk to the output area with a single insert"""
+        chunks = []
+        while True:
+            try:
+                chunks.append(self.output_chunks.get_nowait())
+            except queue.Empty:
+                break
+        
+        if chunks:
+            self.output_text.config(state=tk.NORMAL)
+            self.output_text.insert(tk.END, ''.join(chunks))
+            self.output_text.see(tk.END)
+            self.output_text.config(state=tk.DISABLED)
+        
+        if reschedule:
+            self.output_flush_id = self.root.after(self.output_flush_ms, self._flush_output)
+    
+    def end_output_stream(self):
+        """Flush any remaining chunks and stop the flush loop"""
+        if self.output_flush_id is not None:
+            self.root.after_cancel(self.output_flush_id)
+            self.output_flush_id = None
+        self._flush_output(reschedule=False)
+        
+        self.output_text.edit_separator()
+        self.output_text['autoseparators'] = True
+    
+    def display_prompt(self, prompt: str, user_input: str, save: bool = True):
+        """Display the generated prompt and save to history (unless save is False)"""
         self.output_text.config(state=tk.NORMAL)
         self.output_text.delete("1.0", tk.END)
         self.output_text.insert("1.0", prompt)
@@ -963,12 +1564,8 @@ class AIPromptGenerator:
         self.last_generated_prompt = prompt
         
         # Add to history
-        self.history_manager.add_entry(
-            user_input, 
-            prompt, 
-            'ml_generated'
-        )
-        self.refresh_history_list()
+        if save:
+            self.add_history_entry(user_input, prompt, 'ml_generated')
         
         # Update context status
         self.update_context_status()
@@ -981,66 +1578,192 @@ class AIPromptGenerator:
             "requirements": []
         }
     
-    def generate_ml_prompt(self, user_input: str) -> str:
-        """Use ML (OpenAI or Anthropic) to execute the user's request with conversation context"""
+    def build_ml_request(self, user_input: str) -> dict:
+        """Snapshot everything a generation needs (runs on the Tk thread)"""
+        # Older turns survive only as a summary, sent ahead of the
+        # history (not in the system prompt) so the prefix stays stable
+        summary_messages = ()
+        if self.conversation_summary:
+            summary_messages = (
+                {'role': 'user', 'content': f"Summary of our earlier conversation:\n{self.conversation_summary}"},
+                {'role': 'assistant', 'content': "Understood."}
+            )
+        
+        # Build messages list with conversation history for context and
+        # the current user input; stored messages are never mutated, so
+        # they are shared rather than copied
+        messages = [
+            *summary_messages,
+            *self.conversation_history,
+            {'role': 'user', 'content': user_input}
+        ]
+        
+        response_key = None
+        if self.client_type in ('openai', 'anthropic'):
+            response_key = ResponseCache.make_key(self.model, SYSTEM_PROMPT, messages)
+        
+        # The prompt cache is keyed by the input alone, so it only applies
+        # when there is no earlier context the answer could depend on
+        prompt_key = None
+        if len(messages) == 1:
+            prompt_key = self.validate_and_sanitize_input(user_input).lower()
         
-        # System prompt for AI assistant behavior
-        system_prompt = """Transform the user's input into a clear, AI-ready prompt. Follow their input as closely as possible - preserve their exact intent, wording, and all specific details. Make it detailed enough to be actionable but concise. Use context from previous messages. Don't add extra information not requested by the user."""
+        return {
+            'user_input': user_input,
+            'messages': messages,
+            'prompt_key': prompt_key,
+            'response_key': response_key,
+            'prompt_embedding': None,  # Filled in by the prompt cache lookup
+            'generation': self.conversation_generation
+        }
+    
+    def record_turn(self, request: dict, response: str, source: str):
+        """Add a finished turn to the conversation and caches (runs on the Tk thread)"""
+        # Context cleared while the request was in flight; don't bring it back
+        if request['generation'] == self.conversation_generation:
+            self.add_to_conversation('user', request['user_input'])
+            self.add_to_conversation('assistant', response)
+            self.update_context_status()
+        
+        if request['prompt_key']:
+            self.prompt_cache.put(request['prompt_key'], response,
+                                  request['prompt_embedding'])
+        if source == 'api' and request['response_key']:
+            self.response_cache.put(request['response_key'], response)
+    
+    def generate_ml_prompt(self, request: dict, on_chunk=None) -> tuple:
+        """Use ML (OpenAI or Anthropic) to execute the user's request with conversation context
+        
+        Runs on a worker thread and only reads the request built by
+        build_ml_request, apart from filling in its prompt_embedding. Returns (response, source), where source is 'api',
+        'truncated', 'cache' or 'fallback'; the turn is recorded by
+        finish_ml_prompt.
+        Text is passed to on_chunk as it streams in, if given.
+        """
+        user_input = request['user_input']
+        messages = request['messages']
         
         try:
-            # Build messages list with conversation history
-            messages = []
+            # Identical requests (model, system prompt and messages) are
+            # answered from the persistent response cache
+            if request['response_key']:
+                cached_response = self.response_cache.get(request['response_key'])
+                if cached_response is not None:
+                    return cached_response, 'cache'
             
-            # Add conversation history for context
-            for msg in self.conversation_history:
-                messages.append({
-                    'role': msg['role'],
-                    'content': msg['content']
-                })
+            # Without context, reuse the response for the same (or a
+            # near-identical) input
+            if request['prompt_key']:
+                # The input's embedding is computed here, off the Tk thread,
+                # and handed back for caching the response in record_turn
+                cached_response, request['prompt_embedding'] = (
+                    self.prompt_cache.lookup(request['prompt_key']))
+                if cached_response is not None:
+                    return cached_response, 'cache'
             
-            # Add current user input
-            messages.append({
-                'role': 'user',
-                'content': user_input
-            })
+            if self.client_type not in ('openai', 'anthropic'):
+                # No API available (e.g. the local model), so no token cap
+                # either; use fallback
+                return self.build_universal_prompt(user_input), 'fallback'
+            
+            max_output_tokens = self.output_token_cap(user_input)
             
             if self.client_type == 'openai':
                 # OpenAI API call with conversation context
-                response = self.client.chat.completions.create(
+                ai_response, finish_reason = self.stream_openai_response(
+                    on_chunk,
                     model=self.model,
-                    messages=[
-                        {"role": "system", "content": system_prompt}
-                    ] + messages,
-                    max_completion_tokens=2000
+                    messages=[{"role": "system", "content": SYSTEM_PROMPT}, *messages],
+                    max_completion_tokens=max_output_tokens
                 )
-                ai_response = response.choices[0].message.content
+                truncated = finish_reason == 'length'
                 
             elif self.client_type == 'anthropic':
                 # Anthropic API call with conversation context
-                response = self.client.messages.create(
+                # Mark the system prompt and history as a cacheable prefix
+                with self.client.messages.stream(
                     model=self.model,
-                    max_tokens=2000,
-                    system=system_prompt,
-                    messages=messages
-                )
-                ai_response = response.content[0].text
-            
-            else:
-                # No API available, use fallback
-                return self.build_universal_prompt(user_input)
-            
-            # Add to conversation history
-            self.add_to_conversation('user', user_input)
-            self.add_to_conversation('assistant', ai_response)
+                    max_tokens=max_output_tokens,
+                    system=[{
+                        'type': 'text',
+                        'text': SYSTEM_PROMPT,
+                        'cache_control': {'type': 'ephemeral'}
+                    }],
+                    messages=self.mark_cached_prefix(messages)
+                ) as stream:
+                    pieces = []
+                    for text in stream.text_stream:
+                        pieces.append(text)
+                        if on_chunk:
+                            on_chunk(text)
+                    truncated = stream.get_final_message().stop_reason == 'max_tokens'
+                ai_response = ''.join(pieces)
             
-            return ai_response
+            # A reply cut off at the token cap is shown but not kept
+            return ai_response, 'truncated' if truncated else 'api'
 
         except Exception as e:
             # On error, use fallback
             print(f"API Error: {e}")
-            return self.build_universal_prompt(user_input)
+            return self.build_universal_prompt(user_input), 'fallback'
 
     
+    def output_token_cap(self, user_input: str) -> int:
+        """Get the output token budget for rewriting user_input
+        
+        The response is a rewrite of the new input, so the budget follows its
+        length; the history is context and does not add to it.
+        """
+        input_tokens = len(user_input) // 4  # Rough average for English
+        encoder = get_token_encoder(self.model)
+        if encoder is not None:
+            try:
+                input_tokens = len(encoder.encode(user_input))
+            except Exception as e:
+                print(f"Error counting tokens: {e}")
+        return min(MAX_OUTPUT_TOKENS, max(MIN_OUTPUT_TOKENS, input_tokens * 2))
+    
+    def stream_openai_response(self, on_chunk, **request) -> tuple:
+        """Stream an OpenAI-compatible chat completion
+        
+        Returns (text, finish_reason); finish_reason is 'length' when the
+        reply was cut off at the token limit.
+        """
+        pieces = []
+        finish_reason = None
+        for chunk in self.client.chat.completions.create(stream=True, **request):
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+            text = choice.delta.content
+            if text:
+                pieces.append(text)
+                if on_chunk:
+                    on_chunk(text)
+        return ''.join(pieces), finish_reason
+    
+    def mark_cached_prefix(self, messages: list) -> list:
+        """Add an Anthropic cache breakpoint on the last history message
+        
+        Everything up to that message is identical on the next request, so
+        the provider can reuse it instead of re-processing the whole history.
+        """
+        if len(messages) < 2:
+            return messages
+        
+        last_history = messages[-2]
+        marked = {
+            'role': last_history['role'],
+            'content': [{
+                'type': 'text',
+                'text': last_history['content'],
+                'cache_control': {'type': 'ephemeral'}
+            }]
+        }
+        return messages[:-2] + [marked, messages[-1]]
+    
     def show_preview(self, final_prompt: str):
         """Show preview of the prompt that would be sent"""
         preview_text = f"""=== PROMPT THAT WILL BE SENT ===
@@ -1066,43 +1789,42 @@ This is a preview. Uncheck 'Preview before sending' to actually generate."""
             return
         
         # Disable button during generation
-        self.generate_button.config(state=tk.DISABLED, text="Generating...")
-        self.root.update()
-        
+        self.set_generating(True)
+        self.begin_output_stream()
+        self.run_in_background(
+            self.request_api_response, final_prompt, self.queue_output,
+            on_done=lambda f: self.finish_api_response(f, user_input)
+        )
+    
+    def request_api_response(self, final_prompt: str, on_chunk=None) -> str:
+        """Call the Perplexity API (runs on a worker thread)"""
+        # Call Perplexity API with a simple, direct system prompt
+        response, _ = self.stream_openai_response(
+            on_chunk,
+            model="sonar",
+            messages=[
+                {
+                    "role": "system", 
+                    "content": "You are a helpful AI assistant that provides clear, accurate, and well-structured responses."
+                },
+                {
+                    "role": "user", 
+                    "content": final_prompt
+                }
+            ]
+        )
+        return response
+    
+    def finish_api_response(self, future, user_input: str):
+        """Display a finished Perplexity API response"""
+        self.end_output_stream()
         try:
-            # Call Perplexity API with a simple, direct system prompt
-            response = self.client.chat.completions.create(
-                model="sonar",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are a helpful AI assistant that provides clear, accurate, and well-structured responses."
-                    },
-                    {
-                        "role": "user", 
-                        "content": final_prompt
-                    }
-                ]
-            )
-            
-            # Extract the generated response
-            generated_response = response.choices[0].message.content
-            
-            # Display the result
-            self.output_text.config(state=tk.NORMAL)
-            self.output_text.delete("1.0", tk.END)
-            self.output_text.insert("1.0", generated_response)
-            self.output_text.config(state=tk.DISABLED)
-            
+            # The response is already on screen, streamed in as it arrived
+            generated_response = future.result()
             self.last_generated_prompt = generated_response
             
             # Add to history
-            self.history_manager.add_entry(
-                user_input, 
-                generated_response, 
-                'universal'
-            )
-            self.refresh_history_list()
+            self.add_history_entry(user_input, generated_response, 'universal')
             
         except Exception as e:
             messagebox.showerror("Generation Error", 
@@ -1114,7 +1836,7 @@ This is a preview. Uncheck 'Preview before sending' to actually generate."""
         
         finally:
             # Re-enable button
-            self.generate_button.config(state=tk.NORMAL, text="Generate Prompt")
+            self.set_generating(False)
     
     def copy_to_clipboard(self):
         """Copy the generated prompt to clipboard"""
@@ -1170,7 +1892,7 @@ This is a preview. Uncheck 'Preview before sending' to actually generate."""
     def export_prompt(self):
         """Export prompt with metadata to JSON"""
         output_content = self.output_text.get("1.0", tk.END).strip()
-        input_content = self.input_text.get("1.0", tk.END).strip()
+        input_content = self.input_content
         
         if not output_content:
             messagebox.showwarning("Nothing to Export", "No content to export.")
@@ -1193,33 +1915,53 @@ This is a preview. Uncheck 'Preview before sending' to actually generate."""
                     'timestamp': datetime.now().isoformat(),
                     'version': '2.0'
                 }
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
+                Path(filename).write_bytes(dumps_json(data, indent=True))
                 messagebox.showinfo("Exported", f"Content exported to {filename}")
             except Exception as e:
                 messagebox.showerror("Export Error", f"Failed to export: {str(e)}")
     
     def refresh_history_list(self):
-        """Refresh the history listbox"""
+        """Fill the history listbox from scratch (initial load only)"""
         self.history_listbox.delete(0, tk.END)
         
-        history = self.history_manager.get_history(limit=50)
-        for entry in history:
-            self.history_listbox.insert(tk.END, entry.get_display_text())
+        history = self.history_manager.get_history(limit=self.history_list_limit)
+        self.history_listbox.insert(tk.END, *(entry.get_display_text() for entry in history))
+    
+    def add_history_entry(self, user_input: str, prompt: str, template_id: str):
+        """Save an entry and insert it at the top of the history listbox"""
+        entry = self.history_manager.add_entry(user_input, prompt, template_id)
+        if entry is None:
+            return
+        
+        self.history_listbox.insert(0, entry.get_display_text())
+        if self.history_listbox.size() > self.history_list_limit:
+            self.history_listbox.delete(self.history_list_limit, tk.END)
     
     def on_history_select(self, event):
-        """Handle history item selection"""
+        """Handle history item selection, coalescing rapid arrow-key moves"""
+        if self._select_after:
+            self.root.after_cancel(self._select_after)
+        self._select_after = self.root.after(50, self._do_history_select)
+    
+    def _do_history_select(self):
+        """Act on the selection once it has settled"""
+        self._select_after = None
         # Just highlight, don't load automatically
-        pass
+    
+    def get_selected_history_index(self) -> Optional[int]:
+        """Get the selected history index, or None if nothing is selected"""
+        selection = self.history_listbox.curselection()
+        if selection:
+            return selection[0]
+        return None
     
     def load_from_history(self):
         """Load selected history entry"""
-        selection = self.history_listbox.curselection()
-        if not selection:
+        index = self.get_selected_history_index()
+        if index is None:
             messagebox.showwarning("No Selection", "Please select a history item first.")
             return
         
-        index = selection[0]
         entry = self.history_manager.get_entry(index)
         
         if entry:
@@ -1233,36 +1975,213 @@ This is a preview. Uncheck 'Preview before sending' to actually generate."""
             self.output_text.insert("1.0", entry.generated_prompt)
             self.output_text.config(state=tk.DISABLED)
     
-    def delete_from_history(self):
-        """Delete selected history entry"""
+    def init_batch_jobs(self):
+        """Set up batch regeneration and resume polling unfinished jobs"""
+        self.batch_file = Path.home() / '.veloxmind_studio' / 'batches.json'
+        self.batch_poll_seconds = 60
+        
+        for job in self.load_batch_jobs():
+            if job['provider'] == self.client_type:
+                self.poll_batch_in_background(job)
+    
+    def load_batch_jobs(self) -> list:
+        """Load the batch jobs that have not been collected yet"""
+        try:
+            return loads_json(self.batch_file.read_bytes())
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            print(f"Error loading batch jobs: {e}")
+            return []
+    
+    def save_batch_jobs(self, jobs: list):
+        """Save the batch jobs that have not been collected yet"""
+        try:
+            self.batch_file.write_bytes(dumps_json(jobs))
+        except Exception as e:
+            print(f"Error saving batch jobs: {e}")
+    
+    def regenerate_batch(self):
+        """Regenerate the selected history entries in one Batch API job"""
         selection = self.history_listbox.curselection()
         if not selection:
+            messagebox.showwarning("No Selection", "Please select one or more history items first.")
+            return
+        if self.client_type not in ('openai', 'anthropic'):
+            messagebox.showwarning("API Not Available", 
+                                 "Batch regeneration needs an OpenAI or Anthropic API key.")
+            return
+        
+        entries = [self.history_manager.get_entry(index) for index in selection]
+        inputs = {f"entry-{n}": entry.user_input
+                  for n, entry in enumerate(entries) if entry}
+        if not messagebox.askyesno(
+            "Regenerate Selected",
+            f"Submit {len(inputs)} prompt(s) as a batch job? Batches cost less "
+            "but can take up to 24 hours; results are added to history when ready."
+        ):
+            return
+        
+        self.run_in_background(self.submit_batch, inputs,
+                               on_done=self.finish_batch_submit)
+    
+    def submit_batch(self, inputs: dict) -> dict:
+        """Create a batch job for the given inputs (runs on a worker thread)"""
+        if self.client_type == 'openai':
+            lines = [dumps_json({
+                'custom_id': custom_id,
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': {
+                    'model': self.model,
+                    'messages': [
+                        {'role': 'system', 'content': SYSTEM_PROMPT},
+                        {'role': 'user', 'content': user_input}
+                    ],
+                    'max_completion_tokens': self.output_token_cap(user_input)
+                }
+            }) for custom_id, user_input in inputs.items()]
+            input_file = self.client.files.create(
+                file=('batch.jsonl', b'\n'.join(lines) + b'\n'),
+                purpose='batch'
+            )
+            batch = self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint='/v1/chat/completions',
+                completion_window='24h'
+            )
+        else:
+            batch = self.client.messages.batches.create(requests=[{
+                'custom_id': custom_id,
+                'params': {
+                    'model': self.model,
+                    'max_tokens': self.output_token_cap(user_input),
+                    'system': SYSTEM_PROMPT,
+                    'messages': [{'role': 'user', 'content': user_input}]
+                }
+            } for custom_id, user_input in inputs.items()])
+        
+        return {'id': batch.id, 'provider': self.client_type, 'inputs': inputs}
+    
+    def finish_batch_submit(self, future):
+        """Record a submitted batch job and start polling it"""
+        try:
+            job = future.result()
+        except Exception as e:
+            messagebox.showerror("Batch Error", f"Failed to submit batch: {str(e)}")
+            return
+        
+        self.save_batch_jobs(self.load_batch_jobs() + [job])
+        self.poll_batch_in_background(job)
+        messagebox.showinfo("Batch Submitted", 
+                          f"{len(job['inputs'])} prompt(s) submitted. "
+                          "Results will be added to history when the batch completes.")
+    
+    def poll_batch_in_background(self, job: dict):
+        """Poll a batch job until it ends, then collect its results
+        
+        Polling can take hours, so it runs on its own daemon thread rather
+        than the executor, which would hold up exit.
+        """
+        future = Future()
+        future.add_done_callback(
+            lambda f: self.on_generation_complete(f, lambda f: self.finish_batch(f, job))
+        )
+        
+        def poll():
+            try:
+                future.set_result(self.wait_for_batch(job))
+            except Exception as e:
+                future.set_exception(e)
+        
+        threading.Thread(target=poll, daemon=True, name=f"batch-{job['id']}").start()
+    
+    def wait_for_batch(self, job: dict) -> dict:
+        """Wait for a batch job and get its responses by custom_id (runs on a worker thread)"""
+        results = {}
+        if job['provider'] == 'openai':
+            while True:
+                batch = self.client.batches.retrieve(job['id'])
+                if batch.status in ('completed', 'failed', 'expired', 'cancelled'):
+                    break
+                time.sleep(self.batch_poll_seconds)
+            
+            if batch.output_file_id:
+                output = self.client.files.content(batch.output_file_id).text
+                for line in output.splitlines():
+                    if not line.strip():
+                        continue
+                    result = loads_json(line)
+                    response = result.get('response') or {}
+                    if response.get('status_code') != 200:
+                        continue
+                    choice = response['body']['choices'][0]
+                    # Replies cut off at the token limit are left out
+                    if choice.get('finish_reason') != 'length':
+                        results[result['custom_id']] = choice['message']['content']
+        else:
+            while self.client.messages.batches.retrieve(job['id']).processing_status != 'ended':
+                time.sleep(self.batch_poll_seconds)
+            
+            for result in self.client.messages.batches.results(job['id']):
+                if (result.result.type == 'succeeded'
+                        and result.result.message.stop_reason != 'max_tokens'):
+                    results[result.custom_id] = result.result.message.content[0].text
+        
+        return results
+    
+    def finish_batch(self, future, job: dict):
+        """Add a finished batch job's responses to history"""
+        try:
+            results = future.result()
+        except Exception as e:
+            # Left in the job file, so polling resumes on the next start
+            print(f"Error polling batch {job['id']}: {e}")
+            return
+        
+        for custom_id, response in results.items():
+            self.add_history_entry(job['inputs'][custom_id], response, 'batch')
+        self.save_batch_jobs([other for other in self.load_batch_jobs()
+                              if other['id'] != job['id']])
+        
+        messagebox.showinfo("Batch Complete", 
+                          f"{len(results)} of {len(job['inputs'])} prompt(s) regenerated "
+                          "and added to history.")
+    
+    def delete_from_history(self):
+        """Delete selected history entry"""
+        index = self.get_selected_history_index()
+        if index is None:
             messagebox.showwarning("No Selection", "Please select a history item first.")
             return
         
-        index = selection[0]
         if messagebox.askyesno("Confirm Delete", "Delete this history entry?"):
             self.history_manager.delete_entry(index)
-            self.refresh_history_list()
+            self.history_listbox.delete(index)
+            
+            # Pull up the next entry that was beyond the listbox limit
+            entry = self.history_manager.get_entry(self.history_list_limit - 1)
+            if entry and self.history_listbox.size() < self.history_list_limit:
+                self.history_listbox.insert(tk.END, entry.get_display_text())
     
     def clear_history(self):
         """Clear all history"""
         if messagebox.askyesno("Confirm Clear", 
                               "Clear all history? This cannot be undone."):
             self.history_manager.clear_history()
-            self.refresh_history_list()
+            self.history_listbox.delete(0, tk.END)
     
     def spell_check_prompt(self):
         """Check spelling in the input task/idea text"""
         # Get text from input area
-        input_content = self.input_text.get("1.0", tk.END).strip()
+        input_content = self.input_content
         
         if not input_content:
             messagebox.showwarning("Nothing to Check", "No text to spell check.")
             return
         
         # Check if spell checker is available
-        if self.spell_checker is None:
+        if self.get_spell_checker() is None:
             messagebox.showerror(
                 "Spell Checker Not Available",
                 "The 'pyspellchecker' package is not installed.\n\n"
@@ -1284,14 +2203,14 @@ This is a preview. Uncheck 'Preview before sending' to actually generate."""
     def auto_spell_check(self):
         """Automatically check and correct all spelling errors without showing dialog"""
         # Get text from INPUT area
-        input_content = self.input_text.get("1.0", tk.END).strip()
+        input_content = self.input_content
         
         if not input_content:
             messagebox.showwarning("Nothing to Check", "No text to spell check.")
             return
         
         # Check if spell checker is available
-        if self.spell_checker is None:
+        if self.get_spell_checker() is None:
             messagebox.showerror(
                 "Spell Checker Not Available",
                 "The 'pyspellchecker' package is not installed.\n\n"
@@ -1318,42 +2237,49 @@ This is a preview. Uncheck 'Preview before sending' to actually generate."""
                 'replacement': suggestion
             })
         
-        # Apply all corrections (apply_corrections will show success message)
-        self.apply_corrections(corrections)
+        # Apply all corrections
+        self.apply_corrections(apply_text_corrections(input_content, corrections))
+        messagebox.showinfo("Corrections Applied", 
+                          f"{len(corrections)} correction(s) applied successfully!")
     
     def find_spelling_errors(self, text):
         """Find spelling errors in text and return list of errors with suggestions"""
         errors = []
         
-        # Split text into words while preserving positions
-        word_pattern = re.compile(r'\b[a-zA-Z]+\b')
+        # Split text into words while preserving positions; the pattern
+        # skips very short words and common abbreviations
+        matches = list(WORD_PATTERN.finditer(text))
+        words = [match.group().lower() for match in matches]
+        
+        # Check every word against the dictionary in one batch
+        misspelled = self.spell_checker.unknown(words)
         
-        for match in word_pattern.finditer(text):
+        for match, word_lower in zip(matches, words):
             word = match.group()
-            start_pos = match.start()
-            end_pos = match.end()
-            
-            # Skip very short words and common abbreviations
-            if len(word) <= 2:
+            if word_lower not in misspelled:
                 continue
             
-            # Check if word is misspelled
-            if word.lower() not in self.spell_checker:
-                # Get suggestions
-                candidates = self.spell_checker.candidates(word)
-                if candidates:  # Check if candidates is not None
-                    suggestions = list(candidates)
-                    if suggestions:
-                        errors.append({
-                            'word': word,
-                            'start': start_pos,
-                            'end': end_pos,
-                            'suggestions': suggestions[:5],  # Limit to top 5 suggestions
-                            'context': self.get_word_context(text, start_pos, end_pos)
-                        })
+            # Get suggestions, once per distinct misspelling
+            suggestions = self.get_suggestions(word_lower)
+            
+            if suggestions:
+                start_pos = match.start()
+                end_pos = match.end()
+                errors.append({
+                    'word': word,
+                    'start': start_pos,
+                    'end': end_pos,
+                    'suggestions': suggestions,
+                    'context': self.get_word_context(text, start_pos, end_pos)
+                })
         
         return errors
     
+    def _find_suggestions(self, word: str) -> tuple:
+        """Get up to 5 spelling suggestions for a lowercased word"""
+        candidates = self.spell_checker.candidates(word)
+        return tuple(candidates)[:5] if candidates else ()
+    
     def get_word_context(self, text, start, end):
         """Get context around a word for display"""
         context_start = max(0, start - 20)
@@ -1368,27 +2294,9 @@ This is a preview. Uncheck 'Preview before sending' to actually generate."""
         
         return context
     
-    def apply_corrections(self, corrections):
-        """Apply spelling corrections to the input text"""
-        input_content = self.input_text.get("1.0", tk.END).strip()
-        
-        # Sort corrections by position (reverse order to maintain positions)
-        sorted_corrections = sorted(corrections, key=lambda x: x['start'], reverse=True)
-        
-        # Apply each correction
-        for correction in sorted_corrections:
-            input_content = (
-                input_content[:correction['start']] + 
-                correction['replacement'] + 
-                input_content[correction['end']:]
-            )
-        
-        # Update input text
-        self.input_text.delete("1.0", tk.END)
-        self.input_text.insert("1.0", input_content)
-        
-        messagebox.showinfo("Corrections Applied", 
-                          f"{len(corrections)} correction(s) applied successfully!")
+    def apply_corrections(self, corrected_text):
+        """Replace the input text with its spell-corrected version in one edit"""
+        self.input_text.replace("1.0", tk.END, corrected_text)
 
 
 def main():
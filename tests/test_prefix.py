@@ -0,0 +1,87 @@
+"""Checks that requests keep a stable message prefix for prompt caching
+
+Runs without a display: the generator is built without its Tk window.
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from promptcraft_studio import AIPromptGenerator
+
+
+def dump(messages):
+    """Serialize messages the way they are sent, for byte comparisons"""
+    return json.dumps(messages, ensure_ascii=False).encode('utf-8')
+
+
+class PrefixTest(unittest.TestCase):
+    def setUp(self):
+        home = tempfile.TemporaryDirectory()
+        self.addCleanup(home.cleanup)
+        patcher = mock.patch.dict(os.environ, {'HOME': home.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        self.app = AIPromptGenerator.__new__(AIPromptGenerator)
+        self.app.max_conversation_turns = 2
+        self.app.conversation_trim_slack = 2
+        self.app.conversation_generation = 0
+        self.app.client = None
+        self.app.client_type = 'anthropic'
+        self.app.model = 'claude-test'
+        self.app.init_conversation_memory()
+    
+    def add_turn(self, n):
+        self.app.add_to_conversation('user', f"input {n}")
+        self.app.add_to_conversation('assistant', f"prompt {n}")
+    
+    def test_same_history_gives_identical_prefix(self):
+        self.add_turn(1)
+        first = self.app.build_ml_request("first")['messages']
+        second = self.app.build_ml_request("second")['messages']
+        
+        self.assertEqual(dump(first[0:-1]), dump(second[0:-1]))
+        self.assertNotEqual(dump(first), dump(second))
+    
+    def test_prefix_extends_until_block_trim(self):
+        previous = self.app.build_ml_request("input 1")['messages']
+        
+        # Each turn only appends until the history is full
+        for n in (1, 2, 3):
+            self.add_turn(n)
+            messages = self.app.build_ml_request(f"input {n + 1}")['messages']
+            self.assertEqual(dump(messages[:len(previous)]), dump(previous))
+            previous = messages
+        
+        # The next turn fills it, dropping a whole block of turns at once
+        self.add_turn(4)
+        messages = self.app.build_ml_request("input 5")['messages']
+        self.assertEqual([m['content'] for m in messages],
+                         ["input 3", "prompt 3", "input 4", "prompt 4", "input 5"])
+        
+        # ...after which the prefix is stable again
+        self.add_turn(5)
+        after = self.app.build_ml_request("input 6")['messages']
+        self.assertEqual(dump(after[:len(messages)]), dump(messages))
+    
+    def test_cache_breakpoint_leaves_prefix_unchanged(self):
+        self.add_turn(1)
+        self.add_turn(2)
+        messages = self.app.build_ml_request("input 3")['messages']
+        before = dump(messages)
+        marked = self.app.mark_cached_prefix(messages)
+        
+        self.assertEqual(dump(marked[0:-2]), dump(messages[0:-2]))
+        self.assertEqual(marked[-2]['content'][0]['cache_control'], {'type': 'ephemeral'})
+        self.assertEqual(marked[-1], messages[-1])
+        self.assertEqual(dump(messages), before)  # Stored messages not mutated
+
+
+if __name__ == '__main__':
+    unittest.main()